@@ -0,0 +1,32 @@
+import time
+from typing import Callable, Dict
+
+from csgo.collection import load_collections
+from csgo.conversion import ConversionMap, ConversionRules
+from csgo.type.item import Item
+
+
+def time_builder(builder: Callable[..., Dict[Item, ConversionRules]], collections, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        builder(collections)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(repeat: int = 3):
+    collections = load_collections()
+    print(f'{sum(len(c.items) for c in collections.values())} items in {len(collections)} collections')
+
+    if ConversionMap.build_conversion_map(collections) != ConversionMap.build_array_conversion_map(collections):
+        raise AssertionError('Array conversion map differs from the reference one')
+
+    reference = time_builder(ConversionMap.build_conversion_map, collections, repeat)
+    array = time_builder(ConversionMap.build_array_conversion_map, collections, repeat)
+    print(f'build_conversion_map: {reference:.3f}s')
+    print(f'build_array_conversion_map: {array:.3f}s ({reference / array:.1f}x)')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,145 @@
+import random
+from typing import Dict, List, Set, Tuple
+
+from csgo.conversion import get_item_condition_ranges
+from csgo.type.contract import ContractItem
+from csgo.type.item import Item, ItemCollection, ItemCondition, ItemRarity, to_st_track
+from csgo.type.price import ItemPrices, PriceDetails, PriceEntry, ItemSales, SaleEntry, STPrices, STItemPrice, \
+    STItemPriceDetails, PriceTimeRange
+
+updated_at = 1600000000
+
+# items per rarity of a collection, consumer grade to covert
+rarity_sizes = [(2, 4), (2, 4), (3, 5), (3, 4), (2, 3), (1, 2)]
+float_bounds = [(0, 1), (0, 0.8), (0, 0.7), (0, 0.5), (0, 0.08), (0.06, 0.8), (0.1, 0.6), (0.02, 1)]
+condition_multipliers = {
+    ItemCondition.FACTORY_NEW: 3,
+    ItemCondition.MINIMAL_WEAR: 1.8,
+    ItemCondition.FIELD_TESTED: 1,
+    ItemCondition.WELL_WORN: 0.9,
+    ItemCondition.BATTLE_SCARED: 0.8
+}
+
+
+def get_synthetic_item_prices(market_names: int = 2000, listings: int = 50, seed: int = 0) -> ItemPrices:
+    rnd = random.Random(seed)
+    return {
+        f'Item {n} (Field-Tested)': PriceDetails([
+            PriceEntry(f'Item {n} (Field-Tested)', round(rnd.uniform(0.1, 100), 2), rnd.uniform(0.15, 0.38),
+                       item_id=str(rnd.randrange(10 ** 10, 10 ** 11)), withdrawable_in=rnd.choice([None, 0, 24]))
+            for _ in range(listings)
+        ], updated_at) for n in range(market_names)
+    }
+
+
+def get_synthetic_collections(collections: int = 100, seed: int = 0) -> Dict[str, ItemCollection]:
+    rnd = random.Random(seed)
+    res = {}
+    for c in range(collections):
+        collection_name = f'The Synthetic {c} Collection'
+        res[collection_name] = ItemCollection(collection_name, [
+            Item(f'Weapon {c}-{rarity}-{n} | Skin', rarity, collection_name, *rnd.choice(float_bounds))
+            for rarity, (min_size, max_size) in enumerate(rarity_sizes)
+            for n in range(rnd.randint(min_size, max_size))
+        ], c % 2 == 0)
+    return res
+
+
+def get_synthetic_items(collections: Dict[str, ItemCollection]) -> List[Tuple[Item, ItemCondition]]:
+    return [(i, item_condition)
+            for collection in collections.values()
+            for item in collection.items
+            for i in ([item, to_st_track(item)] if collection.st_track else [item])
+            for item_condition in get_item_condition_ranges(i)]
+
+
+def get_synthetic_price(rnd: random.Random, item: Item, item_condition: ItemCondition) -> float:
+    price = 0.03 * 5 ** item.rarity * condition_multipliers[item_condition] * rnd.uniform(0.7, 1.3)
+    return round(price * (2 if item.st_track else 1), 2)
+
+
+def get_synthetic_listings(collections: Dict[str, ItemCollection], listings: int = 20,
+                           seed: int = 0) -> ItemPrices:
+    rnd = random.Random(seed)
+    res = {}
+    for item, item_condition in get_synthetic_items(collections):
+        float_range = get_item_condition_ranges(item)[item_condition]
+        market_name = item.get_market_name(item_condition)
+        res[market_name] = PriceDetails([
+            PriceEntry(market_name, get_synthetic_price(rnd, item, item_condition),
+                       rnd.uniform(float_range.min_value, float_range.max_value), ItemRarity(item.rarity),
+                       item_name=item.name, withdrawable_in=rnd.choice([None, 0, 24]),
+                       item_id=str(rnd.randrange(10 ** 10, 10 ** 11)))
+            for _ in range(rnd.randint(0, listings))
+        ], updated_at)
+    return res
+
+
+def get_synthetic_sales(collections: Dict[str, ItemCollection], seed: int = 0) -> ItemSales:
+    rnd = random.Random(seed)
+    return {item.get_market_name(item_condition): SaleEntry(item.get_market_name(item_condition),
+                                                            get_synthetic_price(rnd, item, item_condition), updated_at)
+            for item, item_condition in get_synthetic_items(collections)}
+
+
+def get_synthetic_st_prices(collections: Dict[str, ItemCollection], seed: int = 0) -> STPrices:
+    rnd = random.Random(seed)
+    return {item.get_market_name(item_condition): STItemPrice(item.get_market_name(item_condition), {
+        PriceTimeRange.DAYS_30: STItemPriceDetails(get_synthetic_price(rnd, item, item_condition), rnd.randint(0, 50))
+    }) for item, item_condition in get_synthetic_items(collections)}
+
+
+def get_synthetic_contract_items(collections: Dict[str, ItemCollection], listings: ItemPrices,
+                                 size: int = 60, seed: int = 0) -> Set[ContractItem]:
+    rnd = random.Random(seed)
+    items = [(item, item_condition) for item, item_condition in get_synthetic_items(collections)
+             if item.rarity == ItemRarity.RESTRICTED and not item.st_track]
+    candidates = [(item, p) for item, item_condition in items[:12]
+                  for p in listings[item.get_market_name(item_condition)].prices]
+    return {ContractItem(item, p) for item, p in rnd.sample(candidates, min(size, len(candidates)))}
+
+
+def get_synthetic_bck_dump(collections: Dict[str, ItemCollection], other_items: int = 10000, seed: int = 0) -> dict:
+    # collection items and many other ones outside of the collections
+    rnd = random.Random(seed)
+
+    def get_price(average: float) -> dict:
+        return {time_range: {'average': round(average * rnd.uniform(0.9, 1.1), 2), 'sold': rnd.randint(0, 500),
+                             'median': round(average, 2), 'standard_deviation': str(round(average / 10, 2)),
+                             'lowest_price': round(average / 2, 2), 'highest_price': round(average * 2, 2)}
+                for time_range in ['24_hours', '7_days', '30_days', 'all_time']}
+
+    items_list = {item.get_market_name(item_condition): {
+        'name': item.get_market_name(item_condition),
+        'price': get_price(get_synthetic_price(rnd, item, item_condition))
+    } for item, item_condition in get_synthetic_items(collections)}
+    for n in range(other_items):
+        market_name = f'Sticker | Synthetic {n}'
+        items_list[market_name] = {'name': market_name, 'price': get_price(rnd.uniform(0.03, 100))}
+    return {'success': True, 'currency': 'RUB', 'timestamp': updated_at, 'items_list': items_list}
+
+
+def get_synthetic_lf_dump(collections: Dict[str, ItemCollection], listings: int = 500, seed: int = 0) -> dict:
+    # ST listings share the entry of their item
+    rnd = random.Random(seed)
+    rarities = {ItemRarity.CONSUMER_GRADE: 'wc', ItemRarity.INDUSTRIAL_GRADE: 'wu', ItemRarity.MIL_SPEC_GRADE: 'wr',
+                ItemRarity.RESTRICTED: 'wm', ItemRarity.COVERT: 'wa'}
+    result = {}
+    for item, item_condition in get_synthetic_items(collections):
+        if item.st_track:
+            continue
+        float_range = get_item_condition_ranges(item)[item_condition]
+        st_track = collections[item.collection_name].st_track
+        result[str(len(result))] = {
+            'n': item.name,
+            'e': ItemCondition.to_short_str(item_condition),
+            'p': int(get_synthetic_price(rnd, item, item_condition) * 100),
+            'pst': int(get_synthetic_price(rnd, to_st_track(item), item_condition) * 100) if st_track else None,
+            't': {'r': rarities.get(item.rarity)},
+            'u': {str(bot): [{
+                'f': f'{int(rnd.uniform(float_range.min_value, float_range.max_value) * 100000)}:{bot}',
+                'st': int(st_track and rnd.random() < 0.3),
+                'td': rnd.choice([None, 0, 24])
+            } for _ in range(listings // 4)] for bot in range(4)}
+        }
+    return {'timestamp': updated_at, 'result': result}
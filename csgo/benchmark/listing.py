@@ -0,0 +1,34 @@
+import time
+
+from csgo.benchmark.data import get_synthetic_item_prices
+from csgo.listing import ListingStore, get_object_size
+
+
+def run(market_names: int = 2000, listings: int = 50):
+    item_prices = get_synthetic_item_prices(market_names, listings)
+    start = time.perf_counter()
+    store = ListingStore.from_item_prices(item_prices)
+    build = time.perf_counter() - start
+    print(f'{market_names * listings} listings of {market_names} market names, store built in {build:.3f}s')
+
+    dict_size = get_object_size(item_prices)
+    store_size = store.get_memory_footprint()
+    print(f'ItemPrices: {dict_size / 2 ** 20:.1f} MiB')
+    print(f'ListingStore: {store_size / 2 ** 20:.1f} MiB ({dict_size / store_size:.1f}x smaller, '
+          f'columns {store.nbytes / 2 ** 20:.1f} MiB)')
+
+    start = time.perf_counter()
+    scanned = sum(1 for details in item_prices.values() for p in details.prices
+                  if p.float_value and 0.2 <= p.float_value < 0.3)
+    scan = time.perf_counter() - start
+    start = time.perf_counter()
+    searched = sum(len(store.get(market_name).in_float_range(0.2, 0.3)) for market_name in item_prices)
+    search = time.perf_counter() - start
+    if scanned != searched:
+        raise AssertionError(f'Float range filter mismatch: {scanned} != {searched}')
+    print(f'float range filter: scan {scan:.3f}s, sorted search {search:.3f}s')
+
+
+if __name__ == '__main__':
+    run(market_names=2000, listings=50)
+    run(market_names=50, listings=2000)
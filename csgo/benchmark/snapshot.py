@@ -0,0 +1,31 @@
+import os
+import tempfile
+import time
+
+from csgo.benchmark.data import get_synthetic_item_prices
+from csgo.snapshot import price_snapshots
+
+
+def run(market_names: int = 2000, listings: int = 50):
+    item_prices = get_synthetic_item_prices(market_names, listings)
+    print(f'{market_names * listings} listings of {market_names} market names')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for extension, snapshot in price_snapshots.items():
+            file_path = os.path.join(tmp_dir, f'prices{extension}')
+            start = time.perf_counter()
+            snapshot.save(item_prices, file_path)
+            save = time.perf_counter() - start
+
+            start = time.perf_counter()
+            listings_store = snapshot.load_listings(file_path)
+            load = time.perf_counter() - start
+            if len(listings_store) != market_names:
+                raise AssertionError(f'{extension} snapshot lost market names')
+
+            print(f'{extension}: save {save:.3f}s, load {load:.3f}s, '
+                  f'{os.path.getsize(file_path) / 2 ** 20:.1f} MiB on disk')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,315 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from functools import cached_property
+from typing import Callable, List, NamedTuple, Optional
+
+import yaml
+
+from csgo.benchmark.data import get_synthetic_collections, get_synthetic_items, get_synthetic_listings, \
+    get_synthetic_sales, get_synthetic_st_prices, get_synthetic_contract_items, get_synthetic_bck_dump, \
+    get_synthetic_lf_dump
+from csgo.collection import load_collections, get_next_level_items
+from csgo.contract import BSItemReturnCalc, get_item_range_rois, get_best_contracts, get_approximated_prices
+from csgo.conversion import ConversionMap
+from csgo.interface.updater import Updater
+from csgo.listing import ListingStore
+from csgo.price import BSPriceManager, STPriceManager, load_item_sales, load_bck_prices, to_lf_price_entries
+from csgo.snapshot import price_snapshots
+from csgo.type.price import PriceTimeRange
+
+
+class Scale(NamedTuple):
+    collections: int
+    listings: int
+
+
+scales = {
+    'small': Scale(collections=20, listings=5),
+    'medium': Scale(collections=50, listings=10),
+    'large': Scale(collections=150, listings=30)
+}
+
+
+# generated on first use with a fixed seed
+class BenchmarkData:
+
+    def __init__(self, scale: Scale, tmp_dir: str) -> None:
+        self.scale = scale
+        self.tmp_dir = tmp_dir
+
+    @cached_property
+    def collections(self):
+        return get_synthetic_collections(self.scale.collections)
+
+    @cached_property
+    def items(self):
+        return [(item, item_condition) for item, item_condition in get_synthetic_items(self.collections)
+                if get_next_level_items(item, self.collections[item.collection_name])]
+
+    @cached_property
+    def conversion_map(self) -> ConversionMap:
+        return ConversionMap(self.collections)
+
+    @cached_property
+    def listings(self):
+        return get_synthetic_listings(self.collections, self.scale.listings)
+
+    @cached_property
+    def sales(self):
+        return get_synthetic_sales(self.collections)
+
+    @cached_property
+    def lf_dump(self) -> dict:
+        # few market names with many listings each, where accumulating them used to be quadratic
+        return get_synthetic_lf_dump(dict(list(self.collections.items())[:2]), self.scale.listings * 200)
+
+    @cached_property
+    def bs_price_manager(self) -> BSPriceManager:
+        price_manager = BSPriceManager()
+        price_manager.listings = ListingStore.from_item_prices(self.listings)
+        price_manager.sales = self.sales
+        return price_manager
+
+    @cached_property
+    def st_price_manager(self) -> STPriceManager:
+        return STPriceManager(get_synthetic_st_prices(self.collections), self.collections)
+
+    @cached_property
+    def contract_items(self):
+        return get_synthetic_contract_items(self.collections, self.listings)
+
+    def get_file(self, file_name: str, save: Callable[[str], None]) -> str:
+        file_path = os.path.join(self.tmp_dir, file_name)
+        if not os.path.exists(file_path):
+            save(file_path)
+        return file_path
+
+    @property
+    def collections_file(self) -> str:
+        def save(file_path: str):
+            with open(file_path, 'w') as f:
+                yaml.dump({'collections': {name: {
+                    'st_track': c.st_track,
+                    'items': {i.name: {'rarity': i.rarity, 'min_float': i.min_float, 'max_float': i.max_float}
+                              for i in c.items}} for name, c in self.collections.items()}},
+                    f, default_flow_style=False)
+
+        return self.get_file('collections.yaml', save)
+
+    def get_prices_file(self, extension: str) -> str:
+        return self.get_file(f'prices{extension}', lambda f: price_snapshots[extension].save(self.listings, f))
+
+    @property
+    def sales_file(self) -> str:
+        return self.get_file('sales.yaml', lambda f: Updater.save_sales(self.sales, f))
+
+    @property
+    def bck_prices_file(self) -> str:
+        def save(file_path: str):
+            with open(file_path, 'w') as f:
+                json.dump(get_synthetic_bck_dump(self.collections, self.scale.collections * 200), f)
+
+        return self.get_file('bck_prices.json', save)
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # prepares the data outside of the measurement and returns the measured call
+    setup: Callable[[BenchmarkData], Callable[[], object]]
+    repeat: Optional[int] = None
+
+
+def get_item_range_rois_call(data: BenchmarkData) -> Callable[[], object]:
+    price_manager = data.st_price_manager
+    return lambda: [get_item_range_rois(item, item_condition, data.collections[item.collection_name],
+                                        price_manager, PriceTimeRange.DAYS_30, 0.1, 0.09)
+                    for item, item_condition in data.items]
+
+
+def get_approximated_prices_call(data: BenchmarkData) -> Callable[[], object]:
+    price_manager = data.st_price_manager
+    prices = price_manager._prices
+
+    def call():
+        # start from empty approximations every run
+        price_manager.set_prices(prices)
+        return [get_approximated_prices(item, item_condition, price_manager, PriceTimeRange.DAYS_30, True, True)
+                for item, item_condition in data.items]
+
+    return call
+
+
+def get_bs_item_returns_call(data: BenchmarkData) -> Callable[[], object]:
+    calc = BSItemReturnCalc(data.conversion_map, data.bs_price_manager)
+    items = list(dict.fromkeys(item for item, _ in data.items))
+    return lambda: [calc.get_item_returns(item) for item in items]
+
+
+def get_best_contracts_call(data: BenchmarkData) -> Callable[[], object]:
+    args = (data.contract_items, data.bs_price_manager, data.collections, 1, 0.1)
+    return lambda: get_best_contracts(*args, conversion_map=data.conversion_map, top=3)
+
+
+def get_float_range_search_call(data: BenchmarkData) -> Callable[[], object]:
+    store = data.bs_price_manager.listings
+    return lambda: sum(len(store.get(market_name).in_float_range(0.07, 0.15)) for market_name in store.index)
+
+
+def get_load_bck_prices_call(data: BenchmarkData) -> Callable[[], object]:
+    market_names = data.st_price_manager.market_name_items.keys()
+    return lambda file_path=data.bck_prices_file: load_bck_prices(market_names, file_path)
+
+
+benchmarks: List[Benchmark] = [
+    Benchmark('conversion.build_conversion_map',
+              lambda data: lambda: ConversionMap.build_conversion_map(data.collections), repeat=1),
+    Benchmark('conversion.build_array_conversion_map',
+              lambda data: lambda: ConversionMap.build_array_conversion_map(data.collections)),
+    Benchmark('collections.load_yaml',
+              lambda data: lambda file_path=data.collections_file: load_collections(file_path)),
+    Benchmark('returns.get_item_range_rois', get_item_range_rois_call),
+    Benchmark('returns.get_approximated_prices', get_approximated_prices_call),
+    Benchmark('returns.bs_get_item_returns', get_bs_item_returns_call),
+    Benchmark('contracts.get_best_contracts', get_best_contracts_call),
+    Benchmark('listing.build_store', lambda data: lambda: ListingStore.from_item_prices(data.listings)),
+    Benchmark('listing.float_range_search', get_float_range_search_call),
+    Benchmark('snapshot.load_yaml',
+              lambda data: lambda file_path=data.get_prices_file('.yaml'): price_snapshots['.yaml'].load(file_path),
+              repeat=1),
+    Benchmark('snapshot.load_npz',
+              lambda data: lambda file_path=data.get_prices_file('.npz'): price_snapshots['.npz'].load_listings(
+                  file_path)),
+    Benchmark('sales.load_yaml', lambda data: lambda file_path=data.sales_file: load_item_sales(file_path)),
+    Benchmark('prices.load_bck', get_load_bck_prices_call),
+    Benchmark('prices.to_lf_price_entries', lambda data: lambda result=data.lf_dump['result']: to_lf_price_entries(
+        result, data.lf_dump['timestamp']))
+]
+
+
+class BenchmarkResult(NamedTuple):
+    min_seconds: float
+    median_seconds: float
+    runs: int
+
+
+class Regression(NamedTuple):
+    name: str
+    baseline_seconds: float
+    current_seconds: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_seconds / self.baseline_seconds
+
+
+def run_benchmark(benchmark: Benchmark, data: BenchmarkData, repeat: int) -> BenchmarkResult:
+    call = benchmark.setup(data)
+    timings = []
+    for _ in range(benchmark.repeat or repeat):
+        # the measured calls print their findings, keep only the timings
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+    return BenchmarkResult(min(timings), statistics.median(timings), len(timings))
+
+
+def run_suite(scale: str = 'medium', repeat: int = 3, name_filter: str = None) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = BenchmarkData(scales[scale], tmp_dir)
+        for benchmark in benchmarks:
+            if name_filter and name_filter not in benchmark.name:
+                continue
+            result = run_benchmark(benchmark, data, repeat)
+            print(f'{benchmark.name}: {result.min_seconds:.4f}s (median {result.median_seconds:.4f}s, '
+                  f'{result.runs} runs)')
+            results[benchmark.name] = result._asdict()
+
+    return {
+        'scale': scale,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created_at': int(time.time()),
+        'results': results
+    }
+
+
+def get_regressions(baseline: dict, current: dict, threshold: float = 0.2) -> List[Regression]:
+    if baseline['scale'] != current['scale']:
+        raise AssertionError(f'Cannot compare {current["scale"]} results with a {baseline["scale"]} baseline')
+    return [Regression(name, baseline['results'][name]['min_seconds'], result['min_seconds'])
+            for name, result in current['results'].items()
+            if name in baseline['results']
+            and result['min_seconds'] > baseline['results'][name]['min_seconds'] * (1 + threshold)]
+
+
+def print_comparison(baseline: dict, current: dict, threshold: float) -> List[Regression]:
+    regressions = get_regressions(baseline, current, threshold)
+    regressed = {r.name for r in regressions}
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            print(f'  {name}: {result["min_seconds"]:.4f}s (no baseline)')
+            continue
+        baseline_seconds = baseline['results'][name]['min_seconds']
+        marker = '!' if name in regressed else ' '
+        print(f'{marker} {name}: {baseline_seconds:.4f}s -> {result["min_seconds"]:.4f}s '
+              f'({result["min_seconds"] / baseline_seconds:.2f}x)')
+    print(f'{len(regressions)} regressions over {threshold:.0%}')
+    return regressions
+
+
+def load_results(file_path: str) -> dict:
+    with open(file_path) as f:
+        return json.load(f)
+
+
+def save_results(results: dict, file_path: str):
+    with open(file_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def get_args() -> Namespace:
+    parser = ArgumentParser(description='Synthetic data benchmarks, results are compared by their fastest run')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('--scale', choices=list(scales), default='medium')
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('-k', '--filter', type=str, help='run only benchmarks with names containing it')
+    run_parser.add_argument('-o', '--output', type=str, help='save results as a JSON baseline')
+    run_parser.add_argument('--baseline', type=str, help='compare results with a saved baseline')
+    run_parser.add_argument('--threshold', type=float, default=0.2)
+
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('baseline', type=str)
+    compare_parser.add_argument('current', type=str)
+    compare_parser.add_argument('--threshold', type=float, default=0.2)
+
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = get_args()
+    if args.command == 'compare':
+        return 1 if print_comparison(load_results(args.baseline), load_results(args.current), args.threshold) else 0
+
+    results = run_suite(args.scale, args.repeat, args.filter)
+    if args.output:
+        save_results(results, args.output)
+    if args.baseline:
+        return 1 if print_comparison(load_results(args.baseline), results, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,8 @@ from requests import Response, Request
 from requests.auth import AuthBase
 
 from csgo.bs.token import TokenProvider
+from csgo.conversion import ConversionMap
+from csgo.interface.ratelimit import RateLimit
 from csgo.interface.updater import Updater
 from csgo.price import BSPriceManager, trim_mean
 from csgo.type.item import ItemCollection
@@ -30,14 +32,18 @@ class BSUpdater(Updater):
     prices_url = base64.b64decode(
         'aHR0cHM6Ly9iaXRza2lucy5jb20vYXBpL3YxL2dldF9pbnZlbnRvcnlfb25fc2FsZQ=='.encode()).decode()
     sales_url = base64.b64decode('aHR0cHM6Ly9iaXRza2lucy5jb20vYXBpL3YxL2dldF9zYWxlc19pbmZv'.encode()).decode()
-    prices_file = os.path.join('csgo', 'bs', 'bs_prices.yaml')
+    prices_file = os.path.join('csgo', 'bs', 'bs_prices.npz')
     sales_file = os.path.join('csgo', 'bs', 'bs_sales.yaml')
+    http_cache_file = os.path.join('csgo', 'bs', 'bs_http_cache.sqlite')
+    # documented limit is 8 requests per second per API key
+    rate_limits = {urlparse(prices_url).netloc: RateLimit(8, burst=8, max_rate=8)}
 
     def __init__(self, collections: Dict[str, ItemCollection],
-                 price_reference_delta: float = 1.3, token_provider=TokenProvider()) -> None:
+                 price_reference_delta: float = 1.3, token_provider=TokenProvider(),
+                 conversion_map: ConversionMap = None) -> None:
         self.token_provider = token_provider
         super().__init__(collections, BSPriceManager().load(), price_reference_delta,
-                         auth=BSAuth(self.token_provider), price_page_size=480)
+                         auth=BSAuth(self.token_provider), price_page_size=480, conversion_map=conversion_map)
         self.collections = collections
 
     @classmethod
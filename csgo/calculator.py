@@ -1,18 +1,22 @@
 import base64
 import operator
-import sys
-from concurrent.futures.thread import ThreadPoolExecutor
-from typing import List, Dict
-
-from .collection import load_collections, get_next_level_items
-from .contract import BSItemReturnCalc, STItemReturnCalc, LFItemReturnCalc, ItemReturnCalc, DMItemReturnCalc
-from .conversion import get_condition_range, ConversionMap
-from .price import LFPriceManager, BSPriceManager, BCKPriceManager, HXPriceManager, DMPriceManager
+import os
+import time
+from argparse import ArgumentParser, Namespace
+from typing import List, Dict, Tuple
+
+from .collection import get_next_level_items
+from .contract import BSItemReturnCalc, STItemReturnCalc, LFItemReturnCalc, DMItemReturnCalc, ItemReturnCalc
+from .conversion import load_compiled_collections, get_collections_digest, ConversionMap
+from .instrument import instrumentation, add_instrumentation_args, instrumented
+from .journal import get_journal_file
+from .price import LFPriceManager, BSPriceManager, BCKPriceManager, HXPriceManager, DMPriceManager, PriceManager
+from .returns import ReturnDependencies, IncrementalReturns, get_profitability_changes, is_profitable
 from .type.contract import ItemReturn
-from .type.float import FloatRange
-from .type.item import to_st_track, ItemRarity, Item, ItemCondition
+from .type.item import to_st_track, ItemRarity, Item, ItemCondition, ItemCollection
 from .type.model import Model
 from .type.price import PriceTimeRange
+from .util import FileWatcher
 
 
 def pretty_print_items(items: Dict[str, float]):
@@ -27,68 +31,137 @@ Links = {
 }
 
 
-class GetItemReturns:
-    def __init__(self, calc: ItemReturnCalc, time_range):
-        self.calc = calc
-        self.time_range = time_range
-
-    def __call__(self, item: Item) -> List[ItemReturn]:
-        return self.calc.get_item_returns(item, self.time_range)
-
-
-model = Model.from_str(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] else Model.LF
-if not model:
-    raise AssertionError(f'Could not determine model from string value \'{sys.argv[1]}\'')
-else:
-    print(f'Loading model {model.name}')
-
-collections = load_collections()
-conversion_map = ConversionMap(collections)
-
-if model == Model.BS:
-    price_manager = BSPriceManager().load()
-    calc = BSItemReturnCalc(conversion_map, price_manager)
-if model == Model.DM:
-    price_manager = DMPriceManager().load()
-    calc = DMItemReturnCalc(conversion_map, price_manager)
-if model == Model.LF:
-    price_manager = LFPriceManager().load()
-    calc = LFItemReturnCalc(conversion_map, price_manager)
-if model == Model.BCK:
-    price_manager = BCKPriceManager(collections).load()
-    calc = STItemReturnCalc(collections, price_manager,
-                            required_sold_amount=10, possible_price_discount=0.1, return_commission=0.09)
-if model == Model.HX:
-    price_manager = HXPriceManager(collections).load()
-    calc = STItemReturnCalc(collections, price_manager,
-                            required_sold_amount=10, possible_price_discount=0.1, return_commission=0.09)
-
-returns: List[ItemReturn] = []
-time_range: PriceTimeRange = PriceTimeRange.DAYS_30
-items: List[Item] = []
-for col_name, collection in collections.items():
-    for item in collection.items:
-        if item.rarity < ItemRarity.COVERT and get_next_level_items(item, collection):
-            items.append(item)
-            if collection.st_track:
-                items.append(to_st_track(item))
-print(f'{len(items)} items to process')
-
-with ThreadPoolExecutor(max_workers=10) as executor:
-    returns = list((r for res in executor.map(GetItemReturns(calc, time_range), items, chunksize=10) for r in res))
-
-for i in sorted(returns,
-                key=operator.attrgetter('item.rarity', 'item_condition', 'float_range.min_value',
-                                        'float_range.max_value', 'item_revenue'),
-                reverse=False):
-    if i.item_roi > 0.05 and i.item_revenue > 1:
-        guaranteed = '(100%) ' if i.guaranteed else ''
-        item_cond = ItemCondition.to_short_str(i.item_condition)
-        item_range = FloatRange(get_condition_range(i.item_condition).min_value, i.float_range.max_value)
-        print(f'{guaranteed}[{i.item.rarity}] {item_cond} {i.item_float} {i.float_range} '
-              f'{i.item.full_name} ({str(i.item_condition)}) {i.item_investment:.2f}: '
-              f'{i.item_revenue:.2f} ({i.item_roi * 100:.0f}%):')
-        link = Links.get(model)
-        if link and i.item_id:
-            print(f'{link}{i.item_id}')
-        pretty_print_items(i.output_items)
+def get_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument('model', type=str, nargs='?', default='lf')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and print returns that became (un)profitable when prices change')
+    parser.add_argument('--interval', type=float, default=2, help='seconds between price file checks')
+    add_instrumentation_args(parser)
+
+    return parser.parse_args()
+
+
+def get_calc(model: Model, collections: Dict[str, ItemCollection],
+             conversion_map: ConversionMap) -> Tuple[PriceManager, ItemReturnCalc]:
+    if model == Model.BS:
+        price_manager = BSPriceManager().load()
+        return price_manager, BSItemReturnCalc(conversion_map, price_manager)
+    if model == Model.DM:
+        price_manager = DMPriceManager().load()
+        return price_manager, DMItemReturnCalc(conversion_map, price_manager)
+    if model == Model.LF:
+        price_manager = LFPriceManager().load()
+        return price_manager, LFItemReturnCalc(conversion_map, price_manager)
+    if model == Model.BCK:
+        price_manager = BCKPriceManager(collections).load()
+        return price_manager, STItemReturnCalc(collections, price_manager, required_sold_amount=10,
+                                               possible_price_discount=0.1, return_commission=0.09)
+    if model == Model.HX:
+        price_manager = HXPriceManager(collections).load()
+        return price_manager, STItemReturnCalc(collections, price_manager, required_sold_amount=10,
+                                               possible_price_discount=0.1, return_commission=0.09)
+
+
+def get_items(collections: Dict[str, ItemCollection]) -> List[Item]:
+    items: List[Item] = []
+    for col_name, collection in collections.items():
+        for item in collection.items:
+            if item.rarity < ItemRarity.COVERT and get_next_level_items(item, collection):
+                items.append(item)
+                if collection.st_track:
+                    items.append(to_st_track(item))
+    return items
+
+
+def print_item_return(i: ItemReturn, model: Model, prefix: str = ''):
+    guaranteed = '(100%) ' if i.guaranteed else ''
+    item_cond = ItemCondition.to_short_str(i.item_condition)
+    print(f'{prefix}{guaranteed}[{i.item.rarity}] {item_cond} {i.item_float} {i.float_range} '
+          f'{i.item.full_name} ({str(i.item_condition)}) {i.item_investment:.2f}: '
+          f'{i.item_revenue:.2f} ({i.item_roi * 100:.0f}%):')
+    link = Links.get(model)
+    if link and i.item_id:
+        print(f'{link}{i.item_id}')
+    pretty_print_items(i.output_items)
+
+
+def sort_returns(returns: List[ItemReturn]) -> List[ItemReturn]:
+    return sorted(returns, key=operator.attrgetter('item.rarity', 'item_condition', 'float_range.min_value',
+                                                   'float_range.max_value', 'item_revenue'))
+
+
+def watch(model: Model, price_manager: PriceManager, incremental_returns: IncrementalReturns,
+          returns: List[ItemReturn], interval: float):
+    # reloads prices on change, prints returns that became (+) or stopped being (-) profitable
+    watcher = FileWatcher([f for source_file in price_manager.source_files
+                           for f in [source_file, get_journal_file(source_file)]])
+    print(f'Watching {len(watcher.file_paths)} price files, press Ctrl+C to stop')
+    try:
+        while True:
+            time.sleep(interval)
+            changed_files = watcher.get_changed()
+            if not changed_files:
+                continue
+            try:
+                with instrumentation.timer('prices.load'):
+                    price_manager.load()
+            except (OSError, ValueError) as e:
+                # a file replaced in the middle of the read, the next change retries
+                print(f'[WARN] Could not reload prices: {e}')
+                continue
+            evaluation = incremental_returns.evaluate()
+            changes = get_profitability_changes(returns, evaluation.returns)
+            returns = evaluation.returns
+            print(f'[{time.strftime("%H:%M:%S")}] {", ".join(changed_files)} changed: {evaluation}')
+            with instrumentation.timer('report'):
+                for i in sort_returns(changes.profitable):
+                    print_item_return(i, model, '+ ')
+                for i in sort_returns(changes.unprofitable):
+                    print_item_return(i, model, '- ')
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    args = get_args()
+    with instrumented(args, 'calculator'):
+        calculate(args)
+
+
+def calculate(args: Namespace):
+    model = Model.from_str(args.model)
+    if not model:
+        raise AssertionError(f'Could not determine model from string value \'{args.model}\'')
+    else:
+        print(f'Loading model {model.name}')
+
+    collections, conversion_map = load_compiled_collections()
+    with instrumentation.timer('prices.load'):
+        price_manager, calc = get_calc(model, collections, conversion_map)
+
+    time_range: PriceTimeRange = PriceTimeRange.DAYS_30
+    items = get_items(collections)
+    print(f'{len(items)} items to process')
+
+    with instrumentation.timer('returns.dependencies'):
+        dependencies = (ReturnDependencies.from_collections(items, collections) if model in [Model.BCK, Model.HX]
+                        else ReturnDependencies.from_conversion_map(items, conversion_map))
+    incremental_returns = IncrementalReturns(calc, dependencies, price_manager, time_range,
+                                             os.path.join('csgo', f'{model.name.lower()}_returns.pickle'),
+                                             f'{model.name}/{time_range.name}/{calc.get_signature()}/'
+                                             f'{get_collections_digest()}')
+    evaluation = incremental_returns.evaluate()
+    print(evaluation)
+
+    with instrumentation.timer('report'):
+        for i in sort_returns(evaluation.returns):
+            if is_profitable(i):
+                print_item_return(i, model)
+
+    if args.watch:
+        watch(model, price_manager, incremental_returns, evaluation.returns, args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import os
 from typing import List, Dict, Optional
 
 import yaml
@@ -19,17 +20,23 @@ def get_prev_level_items(item: Item, collection: ItemCollection) -> List[Item]:
             for c_item in collection.items if item.rarity - c_item.rarity == 1]
 
 
-def load_collections() -> Dict[str, ItemCollection]:
-    with open('csgo/collections.yaml') as f:
-        res = yaml.load(f, Loader=yaml.SafeLoader)
-        return {
-            col_name: ItemCollection(col_name, [
-                Item(item_name, item_details['rarity'], col_name, item_details['min_float'], item_details['max_float'])
-                for item_name, item_details
-                in col_details['items'].items()], col_details['st_track'])
-            for col_name, col_details
-            in res['collections'].items()
-        }
+collections_file = os.path.join('csgo', 'collections.yaml')
+
+
+def load_collections(file_path: str = collections_file) -> Dict[str, ItemCollection]:
+    with open(file_path) as f:
+        return parse_collections(yaml.load(f, Loader=yaml.SafeLoader))
+
+
+def parse_collections(res: dict) -> Dict[str, ItemCollection]:
+    return {
+        col_name: ItemCollection(col_name, [
+            Item(item_name, item_details['rarity'], col_name, item_details['min_float'], item_details['max_float'])
+            for item_name, item_details
+            in col_details['items'].items()], col_details['st_track'])
+        for col_name, col_details
+        in res['collections'].items()
+    }
 
 
 def get_item_from_collection(item_name: str, collections: Dict[str, ItemCollection]) -> Optional[Item]:
@@ -1,16 +1,22 @@
+import math
 from abc import ABC, abstractmethod
 from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
 from concurrent.futures.thread import ThreadPoolExecutor
-from itertools import combinations
+from functools import partial
+from heapq import nsmallest, nlargest, heappush, heapreplace
+from itertools import combinations, chain, islice, count
 from operator import attrgetter, itemgetter
 from statistics import mean
-from typing import List, Optional, Set, Dict, NamedTuple, Iterable, Tuple
+from typing import List, Optional, Set, Dict, NamedTuple, Iterable, Tuple, Callable, Iterator, TypeVar, FrozenSet
 
 from tqdm import tqdm
 
 from csgo.collection import get_next_level_items, get_item_from_collection
 from csgo.conversion import get_item_to_item_conversions, get_item_possible_conditions, get_item_conversions, \
-    get_condition_from_float, get_condition_range, get_conversion_required_ranges, ConversionMap
+    get_condition_from_float, get_condition_range, get_conversion_required_ranges, ConversionMap, OutcomeIndex, \
+    ConversionRules
+from csgo.instrument import instrumentation
 from csgo.price import STPriceManager, PriceManager, LFPriceManager, DMPriceManager
 from csgo.type.contract import ContractReturn, ItemReturn, OutputItems, ContractItem
 from csgo.type.float import FloatRange
@@ -18,6 +24,7 @@ from csgo.type.item import Item, ItemCollection, ItemCondition, ItemRarity, Item
 from csgo.type.price import PriceTimeRange, get_market_name, ItemWithPrice, PriceEntry
 
 ContractCandidatesMap = Dict[ItemCondition, Dict[ItemRarity, List[Item]]]
+T = TypeVar('T')
 
 
 class ItemConversionResult(NamedTuple):
@@ -34,6 +41,16 @@ class ItemReturnCalc(ABC):
     def get_item_returns(self, item: Item, price_time_range: PriceTimeRange) -> List[ItemReturn]:
         pass
 
+    @abstractmethod
+    def get_item_condition_returns(self, item: Item, item_condition: ItemCondition,
+                                   price_time_range: PriceTimeRange) -> List[ItemReturn]:
+        pass
+
+    @abstractmethod
+    def get_signature(self) -> str:
+        # calculator settings the returns depend on, cached returns are only reused with the same ones
+        pass
+
 
 class BSItemReturnCalc(ItemReturnCalc):
 
@@ -43,26 +60,39 @@ class BSItemReturnCalc(ItemReturnCalc):
         self.price_manager = price_manager
         self.sale_commission = sale_commission
 
+    def get_signature(self) -> str:
+        return f'{type(self).__name__}(sale_commission={self.sale_commission})'
+
     def get_item_returns(self, item: Item, price_time_range: PriceTimeRange = None) -> List[ItemReturn]:
+        return self.get_conversion_returns(item, self.conversion_map.get_rules(item))
+
+    def get_item_condition_returns(self, item: Item, item_condition: ItemCondition,
+                                   price_time_range: PriceTimeRange = None) -> List[ItemReturn]:
+        return self.get_conversion_returns(item, {
+            conversion_range: conversion_items
+            for conversion_range, conversion_items in self.conversion_map.get_rules(item).items()
+            if conversion_range.item_condition == item_condition})
+
+    def get_conversion_returns(self, item: Item, conversion_rules: ConversionRules) -> List[ItemReturn]:
         returns: List[ItemReturn] = []
-        conversion_rules = self.conversion_map.get_rules(item)
         for conversion_range, conversion_items in conversion_rules.items():
             item_condition = conversion_range.item_condition
             contract_return = get_conversion_items_return(conversion_items, self.price_manager)
 
             if contract_return:
                 range_relaxation_epsilon = conversion_range.max_value * 0.07
-                for item_on_sale in self.price_manager.get_items_on_sale(item, item_condition):
-                    if item_on_sale.float_value and (
-                            conversion_range.min_value <= item_on_sale.float_value < conversion_range.max_value + range_relaxation_epsilon):
-                        output_items = to_output_items(conversion_items, self.price_manager)
-                        item_investment = item_on_sale.price * 10
-                        item_return = contract_return * (1 - self.sale_commission)
-
+                items_on_sale = self.price_manager.get_items_on_sale_in_range(
+                    item, item_condition,
+                    conversion_range.min_value, conversion_range.max_value + range_relaxation_epsilon)
+                if len(items_on_sale):
+                    output_items = to_output_items(conversion_items, self.price_manager)
+                    item_return = contract_return * (1 - self.sale_commission)
+                    for index, (price, float_value) in enumerate(zip(items_on_sale.prices.tolist(),
+                                                                     items_on_sale.floats.tolist())):
                         returns.append(ItemReturn(
                             item, item_condition,
-                            item_investment, item_return, conversion_range,
-                            item_float=item_on_sale.float_value, output_items=output_items, item_id=item_on_sale.item_id
+                            price * 10, item_return, conversion_range,
+                            item_float=float_value, output_items=output_items, item_id=items_on_sale.get_item_id(index)
                         ))
 
         return returns
@@ -83,17 +113,24 @@ class STItemReturnCalc(ItemReturnCalc):
         self.return_commission = return_commission
         self.with_price_fallback = with_price_fallback
 
+    def get_signature(self) -> str:
+        return (f'{type(self).__name__}(required_sold_amount={self.required_sold_amount}, '
+                f'possible_price_discount={self.possible_price_discount}, '
+                f'return_commission={self.return_commission}, with_price_fallback={self.with_price_fallback})')
+
     def get_item_returns(self, item: Item, price_time_range: PriceTimeRange) -> List[ItemReturn]:
-        item_collection = self.collections[item.collection_name]
-        item_roi: List[ItemReturn] = []
-        for item_condition in get_item_possible_conditions(item):
-            items_sold = self.price_manager.get_sold(item, item_condition, price_time_range)
-            if (items_sold and items_sold >= self.required_sold_amount) if self.required_sold_amount else True:
-                item_roi += get_item_range_rois(item, item_condition, item_collection, self.price_manager,
-                                                price_time_range,
-                                                self.possible_price_discount, self.return_commission,
-                                                self.with_price_fallback)
-        return item_roi
+        return [r for item_condition in get_item_possible_conditions(item)
+                for r in self.get_item_condition_returns(item, item_condition, price_time_range)]
+
+    def get_item_condition_returns(self, item: Item, item_condition: ItemCondition,
+                                   price_time_range: PriceTimeRange) -> List[ItemReturn]:
+        items_sold = self.price_manager.get_sold(item, item_condition, price_time_range)
+        if not ((items_sold and items_sold >= self.required_sold_amount) if self.required_sold_amount else True):
+            return []
+        return get_item_range_rois(item, item_condition, self.collections[item.collection_name], self.price_manager,
+                                   price_time_range,
+                                   self.possible_price_discount, self.return_commission,
+                                   self.with_price_fallback)
 
 
 class LFItemReturnCalc(BSItemReturnCalc):
@@ -230,13 +267,15 @@ def get_trade_contract_return(items: List[ContractItem],
                               collections: Dict[str, ItemCollection],
                               buy_reduction: float = 1,
                               sale_commission: float = 0.1,
-                              strict: bool = True) -> Tuple[Optional[ContractReturn], Set[str]]:
-    warnings = validate_contract_items(items, collections, strict)
+                              strict: bool = True,
+                              conversion_map: ConversionMap = None,
+                              outcome_index: OutcomeIndex = None) -> Tuple[Optional[ContractReturn], Set[str]]:
+    warnings = validate_contract_items(items, collections, strict, conversion_map)
 
     avg_float: float = mean([i.price_entry.float_value for i in items])
     investment: float = sum([i.price_entry.price for i in items]) * buy_reduction
 
-    conversion_items = get_contract_conversion_items([i.item for i in items], avg_float, collections)
+    conversion_items = get_contract_conversion_items([i.item for i in items], avg_float, collections, outcome_index)
     outcome_items: List[ItemWithPrice] = []
     result: float = 0
     for o_item, o_item_condition in conversion_items:
@@ -253,7 +292,8 @@ def get_trade_contract_return(items: List[ContractItem],
 
 def validate_contract_items(items: List[ContractItem],
                             collections: Dict[str, ItemCollection],
-                            strict: bool = True) -> Set[str]:
+                            strict: bool = True,
+                            conversion_map: ConversionMap = None) -> Set[str]:
     if strict and len(items) != 10:
         raise AssertionError('Contract must be of length 10')
 
@@ -268,7 +308,8 @@ def validate_contract_items(items: List[ContractItem],
             raise AssertionError(f'Item {c_item.item.full_name} has different rarity')
 
         potential_float_range = get_item_conversion_float_range(c_item.item, c_item.price_entry.float_value,
-                                                                collections[c_item.item.collection_name])
+                                                                collections[c_item.item.collection_name],
+                                                                conversion_map)
         if not potential_float_range:
             raise AssertionError(f'Item {c_item.item.full_name} cannot be converted')
         if avg_float >= potential_float_range.max_value:
@@ -279,32 +320,43 @@ def validate_contract_items(items: List[ContractItem],
 
 def get_item_conversion_float_range(item: Item,
                                     item_float: float,
-                                    item_collection: ItemCollection) -> Optional[FloatRange]:
-    item_condition = get_condition_from_float(item_float)
-    conversions = get_item_conversions(item, item_condition, item_collection)
+                                    item_collection: ItemCollection,
+                                    conversion_map: ConversionMap = None) -> Optional[FloatRange]:
+    if conversion_map:
+        conversions = conversion_map.get_rules(item)
+    else:
+        item_condition = get_condition_from_float(item_float)
+        conversions = get_item_conversions(item, item_condition, item_collection)
     return next((f_range for f_range in conversions if item_float in f_range), None)
 
 
 def get_contract_conversion_items(items: List[Item],
                                   avg_float: float,
-                                  collections: Dict[str, ItemCollection]) -> List[ItemWithCondition]:
+                                  collections: Dict[str, ItemCollection],
+                                  outcome_index: OutcomeIndex = None) -> List[ItemWithCondition]:
     outcomes: List[ItemWithCondition] = []
     for item in items:
-        next_items = get_next_level_items(item, collections[item.collection_name])
-        if not next_items:
+        item_outcomes = (outcome_index.get_outcomes(item, avg_float) if outcome_index
+                         else get_next_level_outcomes(item, avg_float, collections))
+        if not item_outcomes:
             raise AssertionError(f'Item {item.full_name} has no conversion outcomes')
-        for target_item in next_items:
-            target_item_condition = next((
-                conv_cond
-                for conv_cond, conversion_range in get_conversion_required_ranges(target_item).items()
-                if avg_float in conversion_range
-            ), None)
+        for target_item, target_item_condition in item_outcomes:
             if not target_item_condition:
                 print(AssertionError(f'Item {target_item.full_name} cannot be converted from float {avg_float}'))
             outcomes.append((target_item, target_item_condition))
     return outcomes
 
 
+def get_next_level_outcomes(item: Item,
+                            avg_float: float,
+                            collections: Dict[str, ItemCollection]) -> List[Tuple[Item, Optional[ItemCondition]]]:
+    return [(target_item, next((
+        conv_cond
+        for conv_cond, conversion_range in get_conversion_required_ranges(target_item).items()
+        if avg_float in conversion_range
+    ), None)) for target_item in get_next_level_items(item, collections[item.collection_name])]
+
+
 def get_approximated_prices(item: Item, item_condition: ItemCondition,
                             price_manager: STPriceManager,
                             price_time_range: PriceTimeRange,
@@ -326,39 +378,167 @@ def get_best_contracts(items: Set[ContractItem],
                        sale_commission: float,
                        strict: bool = True,
                        withdrawable_in: int = None,
-                       in_market: bool = None):
+                       in_market: bool = None,
+                       exhaustive: bool = False,
+                       workers: int = None,
+                       top: int = 1,
+                       conversion_map: ConversionMap = None):
+    if workers and not exhaustive:
+        raise AssertionError('Workers are only used by the exhaustive search')
     item_sets = get_contract_items_sets(items)
     print_items_set_details(item_sets, collections, withdrawable_in)
     print()
-    for item_rarity, condition_set in sorted(item_sets.items(), key=itemgetter(0)):
-        for item_condition, (basic_items, st_items) in sorted(condition_set.items(), key=itemgetter(0)):
-            next_cond_b_items, next_cond_st_items = (
-                condition_set.get(ItemCondition(item_condition - 1), (set(), set()))
-                if item_condition != ItemCondition.BATTLE_SCARED else (set(), set()))
-            next_cond_b_items = set(filter_applicable(next_cond_b_items, withdrawable_in, in_market))
-            next_cond_st_items = set(filter_applicable(next_cond_st_items, withdrawable_in, in_market))
 
-            st = False
-            for c_items in [basic_items, st_items]:
-                if c_items:
-                    applicable_items = set(filter_applicable(c_items, withdrawable_in, in_market))
-                    next_items = next_cond_st_items if st else next_cond_b_items
-                    item_combinations = list(
-                        combinations(applicable_items, 10 if len(applicable_items) >= 10 else len(applicable_items)))
-                    with tqdm(total=len(item_combinations)) as pbar:
-                        with ThreadPoolExecutor(max_workers=10) as executor:
-                            contracts_results = list(filter(None.__ne__, executor.map(
-                                GetContractReturnTask(next_items, collections, price_manager, buy_reduction,
-                                                      sale_commission, strict, pbar),
-                                item_combinations,
-                                chunksize=10)))
-                    if contracts_results:
-                        print(f'[{item_rarity}]{" ST" if st else ""} {str(item_condition)}:')
-                        contract = sorted(contracts_results,
-                                          key=attrgetter('contract_revenue', 'avg_float'), reverse=True)[0]
-                        print_contract_return(contract)
-                        print()
-                st = True
+    conversion_map = conversion_map or ConversionMap(collections)
+    outcome_index = OutcomeIndex(collections)
+    pool_size = workers or 10
+    if exhaustive:
+        executor = (ProcessPoolExecutor(max_workers=pool_size, initializer=init_contract_worker,
+                                        initargs=(collections, price_manager, conversion_map))
+                    if workers else ThreadPoolExecutor(max_workers=pool_size))
+    else:
+        executor = None
+
+    try:
+        for item_rarity, condition_set in sorted(item_sets.items(), key=itemgetter(0)):
+            for item_condition, (basic_items, st_items) in sorted(condition_set.items(), key=itemgetter(0)):
+                next_cond_b_items, next_cond_st_items = (
+                    condition_set.get(ItemCondition(item_condition - 1), (set(), set()))
+                    if item_condition != ItemCondition.BATTLE_SCARED else (set(), set()))
+                next_cond_b_items = set(filter_applicable(next_cond_b_items, withdrawable_in, in_market))
+                next_cond_st_items = set(filter_applicable(next_cond_st_items, withdrawable_in, in_market))
+
+                st = False
+                for c_items in [basic_items, st_items]:
+                    if c_items:
+                        applicable_items = set(filter_applicable(c_items, withdrawable_in, in_market))
+                        next_items = next_cond_st_items if st else next_cond_b_items
+                        task = GetContractReturnTask(next_items, collections, price_manager, buy_reduction,
+                                                     sale_commission, strict, conversion_map, outcome_index)
+                        with instrumentation.timer('contracts.search'):
+                            contracts = (get_top_contracts_exhaustive(applicable_items, task, executor, top,
+                                                                      max_pending=2 * pool_size)
+                                         if exhaustive else ContractSearch(task, top).search(applicable_items))
+                        if contracts:
+                            print(f'[{item_rarity}]{" ST" if st else ""} {str(item_condition)}:')
+                            for contract in contracts:
+                                print_contract_return(contract)
+                                print()
+                    st = True
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def get_top_contracts_exhaustive(items: Set[ContractItem],
+                                 task: 'GetContractReturnTask',
+                                 executor: Executor = None,
+                                 top: int = 1,
+                                 chunk_size: int = 100,
+                                 max_pending: int = 2) -> List[ContractReturn]:
+    size = 10 if len(items) >= 10 else len(items)
+    item_combinations = combinations(items, size)
+    collector = ContractCollector(top)
+    with tqdm(total=math.comb(len(items), size)) as pbar:
+        if isinstance(executor, ProcessPoolExecutor):
+            get_chunk_returns = partial(get_contract_returns, task.next_items, task.buy_reduction,
+                                        task.sale_commission, task.strict, top)
+        else:
+            get_chunk_returns = partial(task.get_returns, top=top)
+        for evaluated, contracts in map_chunks(executor, get_chunk_returns, item_combinations, chunk_size,
+                                                   max_pending):
+            pbar.update(evaluated)
+            instrumentation.count('contracts.evaluated', evaluated)
+            collector.add_all(contracts)
+    return collector.get_contracts()
+
+
+# keyed by source items, the same contract completed from different items is kept once
+class ContractCollector:
+
+    def __init__(self, size: int = 1) -> None:
+        self.size = size
+        self._heap: List[Tuple[float, float, int, ContractReturn]] = []
+        self._keys: Set[FrozenSet[ContractItem]] = set()
+        self._counter = count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def full(self) -> bool:
+        return len(self._heap) >= self.size
+
+    @property
+    def min_revenue(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def add(self, c: Optional[ContractReturn]):
+        if not c:
+            return
+        key = frozenset(c.source_items)
+        if key in self._keys:
+            return
+        entry = (c.contract_revenue, c.avg_float, -next(self._counter), c)
+        if not self.full:
+            heappush(self._heap, entry)
+        elif entry[0:2] > self._heap[0][0:2]:
+            self._keys.remove(frozenset(heapreplace(self._heap, entry)[-1].source_items))
+        else:
+            return
+        self._keys.add(key)
+
+    def add_all(self, contracts: Iterable[Optional[ContractReturn]]):
+        for c in contracts:
+            self.add(c)
+
+    def get_contracts(self) -> List[ContractReturn]:
+        return [entry[-1] for entry in sorted(self._heap, reverse=True)]
+
+
+def map_chunks(executor: Optional[Executor], fn: Callable[[list], T], iterable: Iterable,
+               chunk_size: int, max_pending: int = 2) -> Iterator[T]:
+    chunks = iter(lambda: list(islice(iterable, chunk_size)), [])
+    if not executor:
+        yield from map(fn, chunks)
+        return
+
+    pending = set()
+    for chunk in chunks:
+        pending.add(executor.submit(fn, chunk))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (f.result() for f in done)
+    yield from (f.result() for f in as_completed(pending))
+
+
+class ContractWorkerState(NamedTuple):
+    collections: Dict[str, ItemCollection]
+    conversion_map: ConversionMap
+    outcome_index: OutcomeIndex
+    price_manager: PriceManager
+
+
+worker_state: Optional[ContractWorkerState] = None
+
+
+def init_contract_worker(collections: Dict[str, ItemCollection], price_manager: PriceManager,
+                         conversion_map: ConversionMap = None):
+    global worker_state
+    worker_state = ContractWorkerState(collections, conversion_map or ConversionMap(collections),
+                                       OutcomeIndex(collections), price_manager)
+
+
+def get_contract_returns(next_items: Set[ContractItem],
+                         buy_reduction: float,
+                         sale_commission: float,
+                         strict: bool,
+                         top: int,
+                         item_combinations: List[Tuple[ContractItem, ...]]) -> Tuple[int, List[ContractReturn]]:
+    task = GetContractReturnTask(next_items, worker_state.collections, worker_state.price_manager,
+                                 buy_reduction, sale_commission, strict,
+                                 worker_state.conversion_map, worker_state.outcome_index)
+    return task.get_returns(item_combinations, top)
 
 
 class GetContractReturnTask:
@@ -369,36 +549,172 @@ class GetContractReturnTask:
                  buy_reduction: float,
                  sale_commission: float,
                  strict: bool,
-                 pbar) -> None:
+                 conversion_map: ConversionMap = None,
+                 outcome_index: OutcomeIndex = None) -> None:
         self.next_items = next_items
         self.price_manager = price_manager
         self.collections = collections
         self.buy_reduction = buy_reduction
         self.sale_commission = sale_commission
         self.strict = strict
-        self.pbar = pbar
+        self.conversion_map = conversion_map
+        self.outcome_index = outcome_index
 
     def __call__(self, items: Set[ContractItem]) -> Optional[ContractReturn]:
-        candidates = set(get_contract_candidates(items, self.next_items, self.collections))
-        self.pbar.update(1)
+        candidates = set(get_contract_candidates(items, self.next_items, self.collections, self.conversion_map))
         if candidates and ((len(candidates) == 10) if self.strict else True):
             c, warnings = get_trade_contract_return(
                 list(candidates), self.price_manager, self.collections,
-                buy_reduction=self.buy_reduction, sale_commission=self.sale_commission, strict=self.strict
+                buy_reduction=self.buy_reduction, sale_commission=self.sale_commission, strict=self.strict,
+                conversion_map=self.conversion_map, outcome_index=self.outcome_index
             )
             if c:
                 return c
 
+    def get_returns(self, item_combinations: List[Tuple[ContractItem, ...]],
+                    top: int = 1) -> Tuple[int, List[ContractReturn]]:
+        collector = ContractCollector(top)
+        collector.add_all(self(items) for items in item_combinations)
+        return len(item_combinations), collector.get_contracts()
+
+
+class ContractSearch:
+    # Branch and bound over the same combinations as the exhaustive search. A contract is evaluated from
+    # the combination items and the next condition items, so a branch is bounded by the contracts those
+    # items can form, using the highest outcome prices reachable within their average float window.
+
+    def __init__(self, task: GetContractReturnTask, top: int = 1, tolerance: float = 1e-9) -> None:
+        self.task = task
+        self.top = top
+        self.tolerance = tolerance
+        self.collector = ContractCollector(top)
+        self.evaluated = 0
+        self._outcome_ranges: Dict[Item, List[List[Tuple[float, float, float]]]] = {}
+        self._effective_max_floats: Dict[ContractItem, Optional[float]] = {}
+
+    def search(self, items: Set[ContractItem]) -> List[ContractReturn]:
+        self.collector = ContractCollector(self.top)
+        self.evaluated = 0
+        pool = sorted(items, key=lambda i: (i.price_entry.float_value, i.price_entry.price))
+        next_pool = list(self.task.next_items)
+        size = 10 if len(pool) >= 10 else len(pool)
+        contract_size = 10 if self.task.strict else 1
+
+        suffix_prices: List[List[float]] = [[] for _ in range(len(pool) + 1)]
+        for index in range(len(pool) - 1, -1, -1):
+            suffix_prices[index] = nsmallest(contract_size, suffix_prices[index + 1] + [pool[index].price_entry.price])
+        next_prices = nsmallest(contract_size, (i.price_entry.price for i in next_pool))
+        next_floats = [i.price_entry.float_value for i in next_pool]
+
+        def get_bound(chosen: List[ContractItem], start: int) -> float:
+            prices = nsmallest(contract_size, chain((i.price_entry.price for i in chosen),
+                                                    suffix_prices[start], next_prices))
+            if len(prices) < contract_size:
+                return -math.inf
+
+            floats = list(chain((i.price_entry.float_value for i in chosen),
+                                (i.price_entry.float_value for i in pool[start:start + contract_size]),
+                                (i.price_entry.float_value for i in pool[max(start, len(pool) - contract_size):]),
+                                next_floats))
+            min_float = mean(nsmallest(contract_size, floats))
+            max_float = mean(nlargest(contract_size, floats))
+            candidates = list(chain(chosen, pool[start:], next_pool))
+            ceilings = {i.item: self.get_return_ceiling(i.item, min_float, max_float) for i in candidates}
+
+            bound = max(ceilings.values()) * (1 - self.task.sale_commission) - sum(prices) * self.task.buy_reduction
+            if not self.task.strict:
+                return bound
+
+            # the contract return is an average weighted by the outcomes count of each item,
+            # so it is split into per item scores with the lowest possible total weight
+            weights = {item: len(get_next_level_items(item, self.task.collections[item.collection_name]))
+                       for item in ceilings}
+            ratio = (1 - self.task.sale_commission) / (contract_size * min(weights.values()))
+
+            def get_score(i: ContractItem) -> float:
+                return weights[i.item] * ceilings[i.item] * ratio - i.price_entry.price * self.task.buy_reduction
+
+            # items that cannot become underperforming for any completion stay in the contract
+            remaining = size - len(chosen)
+            max_avg_float = (sum(i.price_entry.float_value for i in chosen) +
+                             sum(i.price_entry.float_value for i in pool[len(pool) - remaining:])) / size
+            retained = [i for i in chosen if self.get_effective_max_float(i) and
+                        self.get_effective_max_float(i) > max_avg_float + self.tolerance]
+            if len(retained) < size - int(size / 2):
+                retained = []
+            optional = [i for i in candidates if i not in retained]
+            score = (sum(get_score(i) for i in retained) +
+                     sum(nlargest(contract_size - len(retained), (get_score(i) for i in optional))))
+            return min(bound, score)
+
+        def branch(chosen: List[ContractItem], start: int):
+            if len(chosen) == size:
+                self.evaluate(chosen)
+                return
+            for index in range(start, len(pool) - (size - len(chosen)) + 1):
+                # the bound only decreases with the start index, so the remaining siblings are pruned too
+                if (self.collector.full and
+                        get_bound(chosen, index) < self.collector.min_revenue - self.tolerance):
+                    return
+                chosen.append(pool[index])
+                branch(chosen, index + 1)
+                chosen.pop()
+
+        branch([], 0)
+        instrumentation.count('contracts.evaluated', self.evaluated)
+        return self.collector.get_contracts()
+
+    def evaluate(self, items: List[ContractItem]):
+        self.evaluated += 1
+        self.collector.add(self.task(tuple(items)))
+
+    def get_return_ceiling(self, item: Item, min_float: float, max_float: float) -> float:
+        if item not in self._outcome_ranges:
+            self._outcome_ranges[item] = get_contract_outcome_ranges(item, self.task.collections,
+                                                                     self.task.price_manager)
+        outcome_prices: List[float] = []
+        for n_item_ranges in self._outcome_ranges[item]:
+            n_item_price = max((price for min_value, max_value, price in n_item_ranges
+                                if min_value < max_float and max_value > min_float), default=None)
+            if not n_item_price:
+                return 0
+            outcome_prices.append(n_item_price)
+        return mean(outcome_prices) if outcome_prices else 0
+
+    def get_effective_max_float(self, c_item: ContractItem) -> Optional[float]:
+        if c_item not in self._effective_max_floats:
+            f_range = get_item_conversion_float_range(c_item.item, c_item.price_entry.float_value,
+                                                      self.task.collections[c_item.item.collection_name],
+                                                      self.task.conversion_map)
+            self._effective_max_floats[c_item] = f_range.max_value if f_range else None
+        return self._effective_max_floats[c_item]
+
+
+def get_contract_outcome_ranges(item: Item,
+                                collections: Dict[str, ItemCollection],
+                                price_manager: PriceManager) -> List[List[Tuple[float, float, float]]]:
+    outcome_ranges = []
+    for n_item in get_next_level_items(item, collections[item.collection_name]):
+        n_item_ranges = []
+        for n_item_cond, conversion_range in get_conversion_required_ranges(n_item).items():
+            n_item_price = price_manager.get_avg_price(n_item, n_item_cond)
+            if n_item_price:
+                n_item_ranges.append((conversion_range.min_value, conversion_range.max_value, n_item_price))
+        outcome_ranges.append(n_item_ranges)
+    return outcome_ranges
+
 
 def get_underperforming_items(items: Iterable[ContractItem],
-                              collections: Dict[str, ItemCollection]) -> Dict[ContractItem, FloatRange]:
+                              collections: Dict[str, ItemCollection],
+                              conversion_map: ConversionMap = None) -> Dict[ContractItem, FloatRange]:
     if not items:
         return {}
     avg_float: float = mean([i.price_entry.float_value for i in items])
     underperforming = {}
     for i in items:
         potential_float_range = get_item_conversion_float_range(i.item, i.price_entry.float_value,
-                                                                collections[i.item.collection_name])
+                                                                collections[i.item.collection_name],
+                                                                conversion_map)
         if potential_float_range and avg_float >= potential_float_range.max_value:
             underperforming[i] = potential_float_range
     return underperforming
@@ -406,8 +722,9 @@ def get_underperforming_items(items: Iterable[ContractItem],
 
 def get_contract_candidates(items: Set[ContractItem],
                             next_level_items: Set[ContractItem],
-                            collections: Dict[str, ItemCollection]) -> Iterable[ContractItem]:
-    u = get_underperforming_items(items, collections)
+                            collections: Dict[str, ItemCollection],
+                            conversion_map: ConversionMap = None) -> Iterable[ContractItem]:
+    u = get_underperforming_items(items, collections, conversion_map)
     candidates = set(items).difference(u.keys()) if len(u) <= int(len(items) / 2) else set(u.keys())
     if not candidates:
         return []
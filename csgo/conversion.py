@@ -1,23 +1,25 @@
-from typing import Dict, List, Set
+import hashlib
+import os
+import pickle
+from bisect import bisect_right
+from typing import Dict, List, Set, Tuple, Optional, NamedTuple
 
-from csgo.collection import get_next_level_items
-from csgo.type.float import FloatRange, is_in_float_range
+import numpy as np
+import yaml
+
+from csgo.collection import get_next_level_items, collections_file, parse_collections
+from csgo.instrument import instrumentation
+from csgo.type.float import FloatRange, is_in_float_range, ItemConditionRanges
 from csgo.type.item import ItemCondition, Item, ItemCollection, ItemWithCondition, to_basic, to_st_track
 
 eps = 0.000000000001
 
 ConversionRules = Dict[FloatRange, Dict[Item, ItemCondition]]
+OutcomeBreakpoints = Tuple[Item, List[float], List[ItemCondition]]
 
 
 def get_condition_range(cond: ItemCondition) -> FloatRange:
-    ranges = {
-        ItemCondition.BATTLE_SCARED: FloatRange(0.45, 1),
-        ItemCondition.WELL_WORN: FloatRange(0.38, 0.45),
-        ItemCondition.FIELD_TESTED: FloatRange(0.15, 0.38),
-        ItemCondition.MINIMAL_WEAR: FloatRange(0.07, 0.15),
-        ItemCondition.FACTORY_NEW: FloatRange(0, 0.07)
-    }
-    return ranges[cond]
+    return ItemConditionRanges[cond]
 
 
 def get_conversion_float_value(target_float: float, item: Item) -> float:
@@ -107,10 +109,21 @@ def get_item_conversions(item: Item, item_condition: ItemCondition, item_collect
     return item_conversion
 
 
+class RulesCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+
+
 class ConversionMap:
 
-    def __init__(self, collections: Dict[str, ItemCollection]) -> None:
-        self._conversion_map: Dict[Item, ConversionRules] = self.build_conversion_map(collections)
+    def __init__(self, collections: Dict[str, ItemCollection],
+                 conversion_map: Dict[Item, ConversionRules] = None) -> None:
+        self._conversion_map: Dict[Item, ConversionRules] = (
+            conversion_map if conversion_map is not None else self.build_array_conversion_map(collections))
+        self._st_conversion_map: Dict[Item, ConversionRules] = {}
+        self._hits = 0
+        self._misses = 0
 
     @classmethod
     def build_conversion_map(cls, collections: Dict[str, ItemCollection]) -> Dict[Item, ConversionRules]:
@@ -126,13 +139,190 @@ class ConversionMap:
 
         return conversion_map
 
+    @classmethod
+    def build_array_conversion_map(cls, collections: Dict[str, ItemCollection]) -> Dict[Item, ConversionRules]:
+        conversion_map = {}
+        for collection in collections.values():
+            for rarity in sorted({item.rarity for item in collection.items}):
+                next_items = [item for item in collection.items if item.rarity - rarity == 1]
+                if not next_items:
+                    continue
+                breakpoints = ConversionBreakpoints(next_items)
+                for item in collection.items:
+                    if item.rarity == rarity:
+                        for item_condition_range in get_item_condition_ranges(item).values():
+                            conversions = breakpoints.get_item_conversions(item, item_condition_range)
+                            if conversions:
+                                conversion_map[item] = {**conversion_map.get(item, {}), **conversions}
+
+        return conversion_map
+
     def get_rules(self, item: Item) -> ConversionRules:
-        return (
-            self._conversion_map.get(item, {})
-            if not item.st_track
-            else {
-                float_range: {
-                    to_st_track(c_item): c_item_condition
-                    for c_item, c_item_condition in conversion_items.items()
-                } for float_range, conversion_items in self._conversion_map.get(to_basic(item), {}).items()
-            })
+        if not item.st_track:
+            return self._conversion_map.get(item, {})
+
+        rules = self._st_conversion_map.get(item)
+        if rules is not None:
+            self._hits += 1
+            return rules
+
+        self._misses += 1
+        return self._st_conversion_map.setdefault(item, {
+            float_range: {
+                to_st_track(c_item): c_item_condition
+                for c_item, c_item_condition in conversion_items.items()
+            } for float_range, conversion_items in self._conversion_map.get(to_basic(item), {}).items()
+        })
+
+    def cache_info(self) -> RulesCacheInfo:
+        return RulesCacheInfo(self._hits, self._misses, len(self._st_conversion_map))
+
+
+class ConversionBreakpoints:
+    condition_min_floats = np.array([get_condition_range(c).min_value for c in ItemCondition])
+
+    def __init__(self, items: List[Item]) -> None:
+        min_floats = np.array([i.min_float for i in items], dtype=float)
+        max_floats = np.array([i.max_float for i in items], dtype=float)
+        conversion_floats = np.clip((self.condition_min_floats[None, :] - min_floats[:, None]) /
+                                    (max_floats - min_floats)[:, None], 0, 1)
+
+        possible = np.zeros(conversion_floats.shape, dtype=bool)
+        for index, item in enumerate(items):
+            possible[index, get_item_possible_conditions(item)] = True
+        # the highest possible condition of an item is required from its conversion float up to 1,
+        # every next one up to the conversion float of the previous condition
+        max_conversion_floats = np.ones(conversion_floats.shape)
+        for cond in list(ItemCondition)[1:]:
+            max_conversion_floats[:, cond] = np.where(possible[:, cond - 1], conversion_floats[:, cond - 1], 1)
+
+        item_indexes, conditions = np.nonzero(possible)
+        self.items = items
+        self.item_indexes = item_indexes
+        self.conditions = [ItemCondition(c) for c in conditions]
+        self.min_values = conversion_floats[item_indexes, conditions]
+        self.max_values = max_conversion_floats[item_indexes, conditions]
+
+    def get_item_conversions(self, item: Item, item_condition_range: FloatRange) -> ConversionRules:
+        left, right = item_condition_range.min_value, item_condition_range.max_value
+        min_values, max_values = self.min_values, self.max_values
+
+        intersects = (((min_values < right - eps) & (right - eps < max_values)) |
+                      ((min_values < left + eps) & (left + eps < max_values)) |
+                      ((left < min_values) & (min_values < right)) |
+                      ((left < max_values) & (max_values < right)))
+        if not intersects.any():
+            return {}
+        indexes = np.nonzero(intersects)[0]
+        range_min_values = np.maximum(left, min_values[indexes])
+        range_max_values = np.minimum(right, max_values[indexes])
+
+        range_markers = np.unique(np.concatenate((range_min_values, range_max_values)))
+        contained = ((range_min_values[None, :] <= range_markers[:-1, None]) &
+                     (range_markers[1:, None] <= range_max_values[None, :]))
+
+        item_conversion: ConversionRules = {}
+        markers = range_markers.tolist()
+        for marker_index, range_indexes in enumerate(contained):
+            if range_indexes.any():
+                item_conversion[FloatRange(markers[marker_index], markers[marker_index + 1])] = {
+                    to_st_track(self.items[self.item_indexes[i]]) if item.st_track else
+                    self.items[self.item_indexes[i]]: self.conditions[i]
+                    for i in indexes[range_indexes]
+                }
+
+        return item_conversion
+
+
+class OutcomeIndex:
+
+    def __init__(self, collections: Dict[str, ItemCollection]) -> None:
+        self._outcomes: Dict[Item, List[OutcomeBreakpoints]] = self.build_outcome_index(collections)
+
+    @classmethod
+    def build_outcome_index(cls, collections: Dict[str, ItemCollection]) -> Dict[Item, List[OutcomeBreakpoints]]:
+        outcome_index = {}
+        for collection in collections.values():
+            for item in collection.items:
+                for i in [item, to_st_track(item)]:
+                    outcome_index[i] = [cls.get_outcome_breakpoints(n_item)
+                                        for n_item in get_next_level_items(i, collection)]
+        return outcome_index
+
+    @classmethod
+    def get_outcome_breakpoints(cls, item: Item) -> OutcomeBreakpoints:
+        ranges = sorted(get_conversion_required_ranges(item).items(), key=lambda r: r[1].min_value)
+        breakpoints = [conversion_range.min_value for _, conversion_range in ranges] + [ranges[-1][1].max_value]
+        return item, breakpoints, [cond for cond, _ in ranges]
+
+    def get_outcomes(self, item: Item, avg_float: float) -> List[Tuple[Item, Optional[ItemCondition]]]:
+        return [(n_item, get_breakpoint_condition(breakpoints, conditions, avg_float))
+                for n_item, breakpoints, conditions in self._outcomes.get(item, [])]
+
+
+def get_breakpoint_condition(breakpoints: List[float], conditions: List[ItemCondition],
+                             float_value: float) -> Optional[ItemCondition]:
+    index = bisect_right(breakpoints, float_value) - 1
+    if 0 <= index < len(conditions) and breakpoints[index] < float_value < breakpoints[index + 1]:
+        return conditions[index]
+    return None
+
+
+# bump whenever the pickled structures (Item, FloatRange, conversion rules) change shape
+compiled_collections_version = 2
+
+
+class CompiledCollections(NamedTuple):
+    version: int
+    digest: str
+    collections: Dict[str, ItemCollection]
+    conversion_map: Dict[Item, ConversionRules]
+
+
+def get_compiled_collections_file(file_path: str) -> str:
+    return os.path.splitext(file_path)[0] + '.pickle'
+
+
+def get_collections_digest(file_path: str = collections_file) -> str:
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@instrumentation.timed('collections.load')
+def load_compiled_collections(file_path: str = collections_file) -> Tuple[Dict[str, ItemCollection], ConversionMap]:
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    compiled = read_compiled_collections(get_compiled_collections_file(file_path))
+    if not compiled or compiled.version != compiled_collections_version or compiled.digest != digest:
+        with instrumentation.timer('collections.compile'):
+            compiled = compile_collections(content, digest)
+        save_compiled_collections(compiled, get_compiled_collections_file(file_path))
+
+    return compiled.collections, ConversionMap(compiled.collections, compiled.conversion_map)
+
+
+def compile_collections(content: bytes, digest: str) -> CompiledCollections:
+    collections = parse_collections(yaml.load(content, Loader=yaml.SafeLoader))
+    return CompiledCollections(compiled_collections_version, digest, collections,
+                               ConversionMap.build_array_conversion_map(collections))
+
+
+def read_compiled_collections(file_path: str) -> Optional[CompiledCollections]:
+    try:
+        with open(file_path, 'rb') as f:
+            compiled = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError) as e:
+        print(f'[WARN] Ignoring broken compiled collections {file_path}: {e}')
+        return None
+    return compiled if isinstance(compiled, CompiledCollections) else None
+
+
+def save_compiled_collections(compiled: CompiledCollections, file_path: str):
+    tmp_file_path = f'{file_path}.tmp'
+    with open(tmp_file_path, 'wb') as f:
+        pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file_path, file_path)
@@ -8,6 +8,7 @@ from requests import Response
 from requests.auth import AuthBase
 
 from csgo.conversion import ConversionMap
+from csgo.interface.ratelimit import RateLimit
 from csgo.interface.updater import Updater
 from csgo.price import DMPriceManager, trim_mean, PriceManager
 from csgo.type.item import ItemCollection
@@ -15,18 +16,22 @@ from csgo.type.price import PriceEntry
 
 
 class DMUpdater(Updater):
-    prices_file = os.path.join('csgo', 'dm', 'dm_prices.yaml')
+    prices_file = os.path.join('csgo', 'dm', 'dm_prices.npz')
     sales_file = os.path.join('csgo', 'dm', 'dm_sales.yaml')
+    http_cache_file = os.path.join('csgo', 'dm', 'dm_http_cache.sqlite')
     prices_url = base64.b64decode('aHR0cHM6Ly9hcGkuZG1hcmtldC5jb20vZXhjaGFuZ2UvdjEvbWFya2V0L2l0ZW1zP29yZGVyQnk9'
                                   'cHJpY2Umb3JkZXJEaXI9YXNjJmdhbWVJZD1hOGRiJmN1cnJlbmN5PVVTRA=='
                                   .encode()).decode()
     sales_url = base64.b64decode('aHR0cHM6Ly9hcGkuZG1hcmtldC5jb20vbWFya2V'
                                  '0cGxhY2UtYXBpL3YxL2xhc3Qtc2FsZXM/R2FtZUlEPWE4ZGImQ3VycmVuY3k9VVNE'
                                  .encode()).decode()
+    # prices and sales share one host, start below the observed limit and let the bucket find the sustained rate
+    rate_limits = {urlparse(prices_url).netloc: RateLimit(4, burst=4, max_rate=10)}
 
-    def __init__(self, collections: Dict[str, ItemCollection], price_reference_delta: float = 1.3) -> None:
+    def __init__(self, collections: Dict[str, ItemCollection], price_reference_delta: float = 1.3,
+                 conversion_map: ConversionMap = None) -> None:
         super().__init__(collections, DMPriceManager().load(), price_reference_delta,
-                         batch_size=12, price_page_size=100)
+                         batch_size=12, price_page_size=100, conversion_map=conversion_map)
 
     @classmethod
     def get_items_for_price_update(cls, collections: Dict[str, ItemCollection], conversion_map: ConversionMap,
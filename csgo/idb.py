@@ -3,6 +3,8 @@ from typing import Dict
 
 import yaml
 
+from csgo.collection import collections_file
+from csgo.conversion import load_compiled_collections
 from csgo.type.idb import IDBPaintKit, IDBCollection, IDBRarity, IDBSkin, IDBWeapon
 
 
@@ -56,5 +58,6 @@ def update_from_idb():
             'max_float': paintkit.max_float
         }
 
-    with open('csgo/collections.yaml', 'w') as f:
+    with open(collections_file, 'w') as f:
         yaml.dump({'collections': collections}, f, default_flow_style=False)
+    load_compiled_collections(collections_file)
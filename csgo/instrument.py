@@ -0,0 +1,169 @@
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from typing import Dict, NamedTuple, Iterator, Optional, Callable, TypeVar
+
+T = TypeVar('T')
+
+profilers = ['cprofile', 'pyinstrument']
+
+
+class TimerStats(NamedTuple):
+    count: int
+    total_seconds: float
+    max_seconds: float
+
+    def add(self, seconds: float) -> 'TimerStats':
+        return TimerStats(self.count + 1, self.total_seconds + seconds, max(self.max_seconds, seconds))
+
+
+# timers measured from several threads add up, the total can exceed the elapsed time
+class Instrumentation:
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.timers: Dict[str, TimerStats] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+        def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+            @wraps(fn)
+            def wrapper(*args, **kwargs) -> T:
+                with self.timer(name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            self.timers[name] = self.timers.get(name, TimerStats(0, 0, 0)).add(seconds)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+            self.timers = {}
+            self.counters = {}
+
+    def get_summary(self) -> dict:
+        with self._lock:
+            return {
+                'command': ' '.join(sys.argv),
+                'started_at': self.started_at,
+                'elapsed_seconds': time.perf_counter() - self._start,
+                'python': platform.python_version(),
+                # kilobytes on Linux, bytes on macOS
+                'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                'timers': {name: stats._asdict() for name, stats in self.timers.items()},
+                'counters': dict(self.counters)
+            }
+
+    def save_summary(self, file_path: str):
+        tmp_file_path = f'{file_path}.tmp'
+        with open(tmp_file_path, 'w') as f:
+            json.dump(self.get_summary(), f, indent=2)
+        os.replace(tmp_file_path, file_path)
+
+    def print_summary(self):
+        summary = self.get_summary()
+        print(f'Finished in {summary["elapsed_seconds"]:.2f}s:', file=sys.stderr)
+        for name, stats in sorted(self.timers.items(), key=lambda t: t[1].total_seconds, reverse=True):
+            print(f'\t{name}: {stats.total_seconds:.3f}s ({stats.count}x)', file=sys.stderr)
+        for name, value in sorted(self.counters.items()):
+            print(f'\t{name}: {value}', file=sys.stderr)
+
+
+instrumentation = Instrumentation()
+
+
+def add_instrumentation_args(parser: ArgumentParser):
+    parser.add_argument('--metrics', type=str, metavar='FILE',
+                        help='write timers and counters of the run as JSON when it exits')
+    parser.add_argument('--profile', type=str, choices=profilers,
+                        help='capture a profile of the whole run')
+    parser.add_argument('--profile-output', type=str, metavar='FILE',
+                        help='profile file, .prof (cProfile) or .html (pyinstrument) in the working directory '
+                             'by default')
+
+
+@contextmanager
+def instrumented(args: Namespace, name: str) -> Iterator[None]:
+    instrumentation.reset()
+    try:
+        with profiled(args.profile, args.profile_output or get_default_profile_output(args.profile, name)):
+            with instrumentation.timer('total'):
+                yield
+    finally:
+        instrumentation.print_summary()
+        if args.metrics:
+            instrumentation.save_summary(args.metrics)
+            print(f'Metrics saved to {args.metrics}', file=sys.stderr)
+
+
+def get_default_profile_output(profiler: Optional[str], name: str) -> Optional[str]:
+    if not profiler:
+        return None
+    return f'{name}.prof' if profiler == 'cprofile' else f'{name}.html'
+
+
+@contextmanager
+def profiled(profiler: Optional[str], output_file: Optional[str]) -> Iterator[None]:
+    if not profiler:
+        yield
+        return
+
+    if profiler == 'cprofile':
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(output_file)
+            pstats.Stats(profile, stream=sys.stderr).sort_stats('cumulative').print_stats(20)
+            print(f'Profile saved to {output_file}, view it with `python -m pstats {output_file}`', file=sys.stderr)
+    elif profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise AssertionError('pyinstrument is not installed, install it with `pip install pyinstrument` '
+                                 'or use --profile cprofile')
+
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(output_file, 'w') as f:
+                f.write(profile.output_html())
+            print(profile.output_text(), file=sys.stderr)
+            print(f'Profile saved to {output_file}', file=sys.stderr)
+    else:
+        raise AssertionError(f'Unknown profiler {profiler}, expected one of {profilers}')
@@ -0,0 +1,138 @@
+import json
+import sqlite3
+import time
+from datetime import timedelta
+from threading import Lock
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+import requests
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+auth_params = {'api_key', 'code', 'key', 'token'}
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: dict
+    body: bytes
+    stored_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class StoredResponse(Response):
+    # response replayed from the cache without a request
+    stored_at: float
+
+
+class CacheStats:
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.revalidated + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.hits + self.revalidated) / self.requests if self.requests else 0
+
+    def __str__(self) -> str:
+        return (f'{self.requests} requests, {self.hits} fresh hits, {self.revalidated} revalidated, '
+                f'{self.misses} misses ({self.hit_rate:.0%} hit rate), {self.bytes_saved / 2 ** 20:.1f} MiB saved')
+
+
+# GET responses keyed by URL without auth params, revalidated with ETag/Last-Modified after the ttl
+class ResponseCache:
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.stats = CacheStats()
+        self._lock = Lock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, status INTEGER, '
+                                     'headers TEXT, body BLOB, stored_at REAL, etag TEXT, last_modified TEXT)')
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT status, headers, body, stored_at, etag, last_modified FROM responses WHERE key = ?',
+                (get_cache_key(url),)).fetchone()
+        if not row:
+            return None
+        status, headers, body, stored_at, etag, last_modified = row
+        return CachedResponse(status, json.loads(headers), body, stored_at, etag, last_modified)
+
+    def get_fresh(self, request: dict, ttl: float) -> Optional[Response]:
+        entry = self.get(request['url']) if ttl else None
+        if entry and time.time() - entry.stored_at < ttl:
+            self.record(hits=1, bytes_saved=len(entry.body))
+            res = to_response(entry, requests.Request(request['method'], request['url']).prepare(), StoredResponse())
+            res.stored_at = entry.stored_at
+            return res
+        return None
+
+    def get_validators(self, url: str) -> dict:
+        entry = self.get(url)
+        if not entry:
+            return {}
+        return {**({'If-None-Match': entry.etag} if entry.etag else {}),
+                **({'If-Modified-Since': entry.last_modified} if entry.last_modified else {})}
+
+    def resolve(self, url: str, res: Response) -> Response:
+        if res.status_code == 304:
+            entry = self.get(url)
+            if entry:
+                self.record(revalidated=1, bytes_saved=len(entry.body))
+                return to_response(entry, res.request, elapsed=res.elapsed)
+        self.record(misses=1)
+        return res
+
+    def store(self, url: str, res: Response):
+        # a revalidated response is stored again as well, which renews it
+        if res.status_code == 200:
+            self.put(url, res)
+
+    def put(self, url: str, res: Response):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (get_cache_key(url), res.status_code, json.dumps(dict(res.headers)), res.content, time.time(),
+                 res.headers.get('ETag'), res.headers.get('Last-Modified')))
+
+    def record(self, hits: int = 0, revalidated: int = 0, misses: int = 0, bytes_saved: int = 0):
+        with self._lock:
+            self.stats.hits += hits
+            self.stats.revalidated += revalidated
+            self.stats.misses += misses
+            self.stats.bytes_saved += bytes_saved
+
+    def reset_stats(self):
+        self.stats = CacheStats()
+
+
+def get_cache_key(url: str) -> str:
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k not in auth_params]
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def to_response(entry: CachedResponse, request: requests.PreparedRequest, res: Response = None,
+                elapsed: timedelta = timedelta(0)) -> Response:
+    res = res if res is not None else Response()
+    res.status_code = entry.status
+    res.headers = CaseInsensitiveDict(entry.headers)
+    res._content = entry.body
+    res.encoding = get_encoding_from_headers(res.headers)
+    res.url = request.url
+    res.request = request
+    res.elapsed = elapsed
+    return res
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import Callable, List, Set, Optional, Tuple
+
+import requests
+from requests import Response
+
+from csgo.interface.cache import ResponseCache
+from csgo.interface.ratelimit import RateLimiter
+
+RequestSpec = dict
+ResponseHandler = Callable[[Response, List[RequestSpec]], None]
+
+
+# blocking requests on a thread pool driven by an asyncio loop, follow up requests are scheduled right away;
+# only GET requests with a ttl are cached, and only once the handler accepted the response
+class FetchEngine:
+
+    def __init__(self, concurrency: int = 6, rate_limiter: RateLimiter = None, cache: ResponseCache = None) -> None:
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.cache = cache
+        self._local = threading.local()
+
+    def get_session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def is_cached(self, request: RequestSpec) -> bool:
+        # listing pages carry the current ref price in the URL and are never requested again, so requests opt in
+        return self.cache is not None and request['method'] == 'GET' and 'ttl' in request
+
+    def send(self, request: RequestSpec) -> Response:
+        if not self.is_cached(request):
+            return self.get_session().request(request['method'], request['url'], auth=request.get('auth'))
+
+        res = self.get_session().request(request['method'], request['url'], auth=request.get('auth'),
+                                         headers=self.cache.get_validators(request['url']))
+        return self.cache.resolve(request['url'], res)
+
+    def get_cached(self, request: RequestSpec) -> Optional[Response]:
+        if not self.is_cached(request):
+            return None
+        return self.cache.get_fresh(request, request['ttl'])
+
+    def run(self, requests_queue: List[RequestSpec], handle: ResponseHandler) -> List[Exception]:
+        return asyncio.run(self.fetch_all(requests_queue, handle))
+
+    async def fetch_all(self, requests_queue: List[RequestSpec], handle: ResponseHandler) -> List[Exception]:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors: List[Exception] = []
+        pending: Set[asyncio.Task] = set()
+
+        async def fetch(request: RequestSpec) -> Tuple[RequestSpec, Response, bool]:
+            cached = self.get_cached(request)
+            if cached is not None:
+                return request, cached, True
+            async with semaphore:
+                delay = self.rate_limiter.reserve(request['url'])
+                if delay:
+                    await asyncio.sleep(delay)
+                res = await loop.run_in_executor(executor, self.send, request)
+                self.rate_limiter.record(request['url'], res)
+                return request, res, False
+
+        def schedule(requests_to_schedule: List[RequestSpec]):
+            pending.update(asyncio.ensure_future(fetch(r)) for r in requests_to_schedule)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            schedule(requests_queue)
+            try:
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.difference_update(done)
+                    for task in done:
+                        if task.exception():
+                            errors.append(task.exception())
+                            continue
+                        request, res, fresh = task.result()
+                        additional_requests: List[RequestSpec] = []
+                        handle(res, additional_requests)
+                        if not fresh and self.is_cached(request):
+                            self.cache.store(request['url'], res)
+                        schedule(additional_requests)
+            finally:
+                for task in pending:
+                    task.cancel()
+
+        return errors
@@ -0,0 +1,110 @@
+import time
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from requests import Response
+
+
+class RateLimit(NamedTuple):
+    rate: float
+    burst: int = 1
+    min_rate: float = 0.2
+    max_rate: float = None
+    increase: float = 0.05
+    decrease: float = 0.5
+
+
+class RateLimitMetrics(NamedTuple):
+    requests_sent: int
+    rate_limited: int
+    throttled_seconds: float
+    rate: float
+
+    def __str__(self) -> str:
+        return (f'{self.requests_sent} requests, {self.rate_limited} rate limited, '
+                f'{self.throttled_seconds:.1f}s throttled, {self.rate:.2f} req/s')
+
+
+# GCRA token bucket: additive rate increase on success, multiplicative decrease on 429
+class TokenBucket:
+
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+        self.rate = limit.rate
+        self._next_time = 0.0
+        self._blocked_until = 0.0
+        self._lock = Lock()
+        self.requests_sent = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            next_time = max(self._next_time, now)
+            delay = max(0.0, next_time - now - (self.limit.burst - 1) / self.rate, self._blocked_until - now)
+            self._next_time = max(next_time, now + delay) + 1 / self.rate
+            self.requests_sent += 1
+            self.throttled_seconds += delay
+            return delay
+
+    def on_success(self):
+        with self._lock:
+            rate = self.rate + self.limit.increase
+            self.rate = min(rate, self.limit.max_rate) if self.limit.max_rate else rate
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.rate_limited += 1
+            self.rate = max(self.rate * self.limit.decrease, self.limit.min_rate)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def get_metrics(self) -> RateLimitMetrics:
+        return RateLimitMetrics(self.requests_sent, self.rate_limited, self.throttled_seconds, self.rate)
+
+
+class RateLimiter:
+
+    def __init__(self, limits: Dict[str, RateLimit] = None, default_limit: RateLimit = RateLimit(5, burst=5)) -> None:
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._lock = Lock()
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self.buckets.setdefault(host, TokenBucket(self.limits.get(host, self.default_limit)))
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        return self.get_bucket(url).reserve()
+
+    def record(self, url: str, res: Response):
+        bucket = self.get_bucket(url)
+        if res.status_code == 429:
+            bucket.on_rate_limited(get_retry_after(res))
+        elif res.status_code < 500:
+            bucket.on_success()
+
+    def get_metrics(self) -> Dict[str, RateLimitMetrics]:
+        return {host: bucket.get_metrics() for host, bucket in self.buckets.items()}
+
+
+def get_retry_after(res: Response) -> Optional[float]:
+    value = res.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
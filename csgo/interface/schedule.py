@@ -0,0 +1,53 @@
+import math
+import time
+from heapq import nsmallest
+from statistics import mean, pstdev
+from typing import Dict, List, NamedTuple, Optional
+
+from csgo.type.price import ItemPrices, PriceDetails
+
+
+class RefreshPriority(NamedTuple):
+    market_name: str
+    ref_price: Optional[float]
+    roi: float
+    volatility: float
+    staleness_hours: float
+    score: float
+
+
+# refresh priority: chance listings changed since the last update x how much it matters for returns
+class RefreshScheduler:
+
+    def __init__(self, horizon_hours: float = 24, base_value: float = 0.02, unknown_roi: float = 0.5,
+                 volatility_listings: int = 10) -> None:
+        self.horizon_hours = horizon_hours
+        self.base_value = base_value
+        self.unknown_roi = unknown_roi
+        self.volatility_listings = volatility_listings
+
+    def get_priority(self, market_name: str, ref_price: Optional[float],
+                     price_details: Optional[PriceDetails], now: float) -> RefreshPriority:
+        # fetched listings are not filtered like the snapshot loaders do, free ones would divide by zero
+        cheapest = (nsmallest(self.volatility_listings, (p.price for p in price_details.prices if p.price > 0))
+                    if price_details else [])
+        if not ref_price:
+            roi = 0
+        elif cheapest:
+            roi = max(ref_price / cheapest[0] - 1, 0)
+        else:
+            roi = self.unknown_roi
+        volatility = pstdev(cheapest) / mean(cheapest) if len(cheapest) > 1 else 0
+        staleness_hours = ((now - price_details.updated_at) / 3600
+                           if price_details and price_details.updated_at else math.inf)
+
+        change_probability = 1 - math.exp(-staleness_hours / self.horizon_hours * (1 + volatility))
+        score = change_probability * (self.base_value + roi)
+        return RefreshPriority(market_name, ref_price, roi, volatility, staleness_hours, score)
+
+    def rank(self, items: Dict[str, Optional[float]], item_prices: ItemPrices,
+             now: float = None) -> List[RefreshPriority]:
+        now = time.time() if now is None else now
+        return sorted((self.get_priority(market_name, ref_price, item_prices.get(market_name), now)
+                       for market_name, ref_price in items.items()),
+                      key=lambda p: p.score, reverse=True)
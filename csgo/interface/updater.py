@@ -1,20 +1,26 @@
+import os
 import re
 import time
 from abc import ABC, abstractmethod
-from typing import Dict, Set, List, Optional
+from typing import Dict, Set, List, Optional, Callable
 
 import yaml
 from requests import Response
 from requests.auth import AuthBase
-from requests_toolbelt import threaded
 from tqdm import tqdm
 
 from csgo.collection import get_next_level_items
 from csgo.contract import get_conversion_items_return
+from csgo.interface.cache import ResponseCache, StoredResponse
+from csgo.interface.fetch import FetchEngine
+from csgo.interface.ratelimit import RateLimiter, RateLimit
+from csgo.interface.schedule import RefreshScheduler
 from csgo.conversion import ConversionMap, get_item_possible_conditions
-from csgo.price import PriceManager, load_item_sales, load_item_prices
+from csgo.journal import Journal, get_price_journal, get_sales_journal
+from csgo.price import PriceManager, load_item_sales
+from csgo.snapshot import load_price_snapshot, save_price_snapshot
 from csgo.type.item import Item, ItemCondition, ItemCollection, ItemRarity, to_st_track
-from csgo.type.price import get_market_name, ItemPrices, ItemSales, PriceEntry, SaleEntry, PriceDetails
+from csgo.type.price import get_market_name, ItemPrices, ItemSales, PriceEntry, SaleEntry, PriceDetailsBuilder
 from csgo.util import get_batches
 
 
@@ -38,20 +44,27 @@ class Updater(ABC):
     prices_url: str
     sales_file: str
     sales_url: str
+    journal_compaction_size: int = 16 * 2 ** 20
+    max_concurrent_requests: int = 6
+    rate_limits: Dict[str, RateLimit] = {}
+    http_cache_file: str = None
 
     def __init__(self, collections: Dict[str, ItemCollection],
                  price_manager: PriceManager,
                  price_reference_delta: float = 1,
                  auth: AuthBase = None,
                  batch_size: int = None,
-                 price_page_size: int = None):
+                 price_page_size: int = None,
+                 conversion_map: ConversionMap = None):
         self.collections = collections
-        self.conversion_map = ConversionMap(self.collections)
+        self.conversion_map = conversion_map or ConversionMap(self.collections)
         self.price_manager = price_manager
         self.auth = auth
         self.price_reference_delta = price_reference_delta
         self.batch_size = batch_size
         self.price_page_size = price_page_size
+        self.fetch_engine = FetchEngine(self.max_concurrent_requests, RateLimiter(self.rate_limits))
+        self.refresh_scheduler = RefreshScheduler()
 
     @classmethod
     def get_file_name(cls, item_name: str, file_type: str = 'json') -> str:
@@ -121,7 +134,7 @@ class Updater(ABC):
         pass
 
     def request_prices(self, items: Dict[str, float]) -> ItemPrices:
-        prices = {}
+        prices = PriceDetailsBuilder()
         processing_requests = [{
             'method': 'GET',
             'url': self.get_item_prices_url(item_name, ref_price, per_page=self.price_page_size),
@@ -129,85 +142,82 @@ class Updater(ABC):
         } for item_name, ref_price in items.items()]
 
         for requests_batch in get_batches(processing_requests, self.batch_size):
-            while requests_batch:
-                additional_requests = []
-                rate_limited = False
 
-                responses_generator, exceptions_generator = threaded.map(requests_batch, num_processes=6)
-                for res in responses_generator:
-                    rate_limited = self.user_rate_limit_strategy(res, additional_requests, self.auth, rate_limited)
+            def handle_response(res: Response, additional_requests: List[dict]):
+                self.user_rate_limit_strategy(res, additional_requests, self.auth)
 
-                    success = self.check_request(res, additional_requests, self.auth)
-                    if success:
-                        item_name = self.get_item_name_from_url(res.request.url)
-                        items = self.get_prices_from_response(res)
-                        self.update_price_map(prices, items, item_name)
+                success = self.check_request(res, additional_requests, self.auth)
+                if success:
+                    item_name = self.get_item_name_from_url(res.request.url)
+                    items = self.get_prices_from_response(res)
+                    self.update_price_map(prices, items, item_name)
 
-                        page = self.get_page_number(res, self.price_page_size)
-                        tqdm.write(f' - Updated {item_name} with {len(items)} items - '
-                                   f'{page} ({res.elapsed.seconds}s)')
+                    page = self.get_page_number(res, self.price_page_size)
+                    tqdm.write(f' - Updated {item_name} with {len(items)} items - '
+                               f'{page} ({res.elapsed.seconds}s)')
 
-                        if page and len(items) == self.price_page_size:
-                            next_page = page + 1
-                            tqdm.write(f'   Scheduling page {next_page} for {item_name}')
-                            self.add_next_page_request(res, additional_requests, next_page, self.auth)
+                    if page and len(items) == self.price_page_size:
+                        next_page = page + 1
+                        tqdm.write(f'   Scheduling page {next_page} for {item_name}')
+                        self.add_next_page_request(res, additional_requests, next_page, self.auth)
+                elif additional_requests:
+                    tqdm.write(f'Rescheduled {res.request.url}')
 
-                for exc in exceptions_generator:
-                    tqdm.write(f'[ERROR] {exc}')
-                if additional_requests:
-                    tqdm.write(f'Rescheduled {len(additional_requests)} requests')
-                requests_batch = additional_requests
+            for exc in self.fetch_engine.run(requests_batch, handle_response):
+                tqdm.write(f'[ERROR] {exc}')
 
-        return prices
+        return prices.build()
 
     @classmethod
     @abstractmethod
     def get_page_number(cls, res: Response, per_page: int) -> int:
         pass
 
-    def request_sales(self, items: Set[str]) -> ItemSales:
+    def request_sales(self, items: Set[str], ttl_seconds: float = 0) -> ItemSales:
+        if self.http_cache_file and not self.fetch_engine.cache:
+            # only sales requests are cached
+            self.fetch_engine.cache = ResponseCache(self.http_cache_file)
         sales = {}
         processing_requests = [{
-            'method': 'GET', 'url': self.get_item_sales_url(market_name), 'auth': self.auth
+            'method': 'GET', 'url': self.get_item_sales_url(market_name), 'auth': self.auth, 'ttl': ttl_seconds
         } for market_name in items]
 
         for requests_batch in get_batches(processing_requests, self.batch_size):
-            while requests_batch:
-                additional_requests = []
-
-                rate_limited = False
-                responses_generator, exceptions_generator = threaded.map(requests_batch, num_processes=6)
-                for res in responses_generator:
-                    if self.user_rate_limit_strategy(res, additional_requests, self.auth, rate_limited):
-                        rate_limited = True
-
-                    success = self.check_request(res, additional_requests, self.auth)
-                    if success:
-                        sale_price = self.get_sale_price_from_response(res)
-                        item_name = self.get_item_name_from_url(res.request.url)
-                        updated = int(time.time())
-                        sales[item_name] = SaleEntry(item_name, sale_price, updated)
-                        tqdm.write(f'Updated {item_name} with {sale_price} ({res.elapsed.seconds}s)')
-
-                for exc in exceptions_generator:
-                    tqdm.write(f'[ERROR] {exc.exception}')
-
-                if additional_requests:
-                    tqdm.write(f'Rescheduled {len(additional_requests)} requests')
-                requests_batch = additional_requests
+
+            def handle_response(res: Response, additional_requests: List[dict]):
+                self.user_rate_limit_strategy(res, additional_requests, self.auth)
+
+                success = self.check_request(res, additional_requests, self.auth)
+                if success:
+                    sale_price = self.get_sale_price_from_response(res)
+                    item_name = self.get_item_name_from_url(res.request.url)
+                    # a response replayed from the cache is as old as when it was fetched
+                    updated = int(res.stored_at if isinstance(res, StoredResponse) else time.time())
+                    sales[item_name] = SaleEntry(item_name, sale_price, updated)
+                    tqdm.write(f'Updated {item_name} with {sale_price} ({res.elapsed.seconds}s)')
+                elif additional_requests:
+                    tqdm.write(f'Rescheduled {res.request.url}')
+
+            for exc in self.fetch_engine.run(requests_batch, handle_response):
+                tqdm.write(f'[ERROR] {exc}')
 
         return sales
 
     @classmethod
-    def user_rate_limit_strategy(cls, res: Response, requests_queue, auth: AuthBase,
-                                 rate_limited: bool = False) -> bool:
+    def user_rate_limit_strategy(cls, res: Response, requests_queue, auth: AuthBase) -> bool:
+        # pacing, backing off and Retry-After are handled by the fetch engine rate limiter
         if res.status_code == 429:
             requests_queue.append({'method': 'GET', 'url': res.request.url, 'auth': auth})
-            if not rate_limited:
-                time.sleep(3)
-                return True
+            return True
         return False
 
+    def print_fetch_metrics(self):
+        for host, metrics in self.fetch_engine.rate_limiter.get_metrics().items():
+            print(f'{host}: {metrics}')
+        if self.fetch_engine.cache:
+            print(f'HTTP cache: {self.fetch_engine.cache.stats}')
+            self.fetch_engine.cache.reset_stats()
+
     @classmethod
     def check_request(cls, res: Response, requests_queue, auth: AuthBase) -> bool:
         if res.status_code >= 500:
@@ -229,30 +239,22 @@ class Updater(ABC):
 
     @classmethod
     def save_prices(cls, prices: ItemPrices, file_name: str):
-        with open(file_name, 'w') as f:
-            yaml.dump({'items': {
-                item_name: {
-                    'u': price_details.updated_at,
-                    'prices': {
-                        p.item_id: {
-                            **{'f': p.float_value, 'p': p.price},
-                            **({'w': p.withdrawable_in} if p.withdrawable_in else {})
-                        } for p in price_details.prices}}
-                for item_name, price_details in prices.items()
-            }}, f, default_flow_style=False)
+        save_price_snapshot(prices, file_name)
 
     @classmethod
     def save_sales(cls, sales: ItemSales, file_name: str):
-        with open(file_name, 'w') as f:
+        tmp_file_name = f'{file_name}.tmp'
+        with open(tmp_file_name, 'w') as f:
             yaml.dump({'sales': {
                 s.item_name: {**{'u': s.updated_at}, **({'p': s.price} if s.price else {})}
                 for item_name, s in sales.items()
             }}, f, default_flow_style=False)
+        os.replace(tmp_file_name, file_name)
 
-    def update_prices(self, cache_expiration_hours: int = 2):
+    def update_prices(self, cache_expiration_hours: int = 2, time_budget_seconds: float = None):
         start = time.time()
 
-        item_prices = load_item_prices(self.prices_file)
+        item_prices = load_price_snapshot(self.prices_file)
         update_threshold = int(time.time()) - cache_expiration_hours * 60 * 60
 
         items_for_update = {
@@ -263,17 +265,27 @@ class Updater(ABC):
         }
 
         print(f'Updating {len(items_for_update)} items price information...')
+        priorities = self.refresh_scheduler.rank(items_for_update, item_prices)
         prices = item_prices
+        journal = get_price_journal(self.prices_file)
         with tqdm(total=len(items_for_update)) as pbar:
-            for items_batch in get_batches(list(items_for_update.items()), 100):
-                items = dict(items_batch)
+            for batch_index, items_batch in enumerate(get_batches(priorities, 100)):
+                if time_budget_seconds is not None and time.time() - start > time_budget_seconds:
+                    tqdm.write(f'Time budget of {time_budget_seconds}s spent, '
+                               f'{len(priorities) - batch_index * 100} items left for the next run')
+                    break
+                items = {p.market_name: p.ref_price for p in items_batch}
                 new_prices = self.request_prices(items)
-                prices = {**prices, **new_prices}
-                self.save_prices(prices, self.prices_file)
+                prices.update(new_prices)
+                journal.append(new_prices)
+                if journal.get_size() > self.journal_compaction_size:
+                    self.compact(journal, lambda: self.save_prices(prices, self.prices_file))
                 pbar.update(len(new_prices))
+        self.compact(journal, lambda: self.save_prices(prices, self.prices_file))
 
         end = time.time()
         print(f'Finished in {end - start:2f}s')
+        self.print_fetch_metrics()
 
     def update_sales(self, cache_expiration_hours: int = 24):
         start = time.time()
@@ -287,24 +299,33 @@ class Updater(ABC):
 
         print(f'Updating {len(items_for_update)} items sales information...')
         sales = item_sales
+        journal = get_sales_journal(self.sales_file)
         with tqdm(total=len(items_for_update)) as pbar:
             for items_batch in get_batches(list(items_for_update), 100):
                 items = set(items_batch)
-                new_sales = self.request_sales(items)
-                sales = {**sales, **new_sales}
-                self.save_sales(sales, self.sales_file)
+                # as fresh as the sales file entries, a response of a restarted run is reused
+                new_sales = self.request_sales(items, cache_expiration_hours * 60 * 60)
+                sales.update(new_sales)
+                journal.append(new_sales)
+                if journal.get_size() > self.journal_compaction_size:
+                    self.compact(journal, lambda: self.save_sales(sales, self.sales_file))
                 pbar.update(len(new_sales))
+        self.compact(journal, lambda: self.save_sales(sales, self.sales_file))
 
         end = time.time()
         print(f'Finished in {end - start:2f}s')
+        self.print_fetch_metrics()
+
+    @classmethod
+    def compact(cls, journal: Journal, save_snapshot: Callable[[], None]):
+        if journal.exists():
+            save_snapshot()
+            journal.clear()
 
     @classmethod
-    def update_price_map(cls, price_map: ItemPrices, prices: List[PriceEntry], item_name: str):
+    def update_price_map(cls, price_map: PriceDetailsBuilder, prices: List[PriceEntry], item_name: str):
         u_time = int(time.time())
         if item_name not in price_map:
-            price_map[item_name] = PriceDetails([], u_time)
+            price_map.add(item_name, (), u_time)
         for p in prices:
-            i_name = p.market_hash_name
-            if i_name not in price_map:
-                price_map[i_name] = PriceDetails([], u_time)
-            price_map[i_name] = PriceDetails(price_map[i_name].prices + [p], u_time)
+            price_map.add(p.market_hash_name, (p,), u_time)
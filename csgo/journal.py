@@ -0,0 +1,85 @@
+import json
+import os
+from typing import Callable, Dict, Generic, Tuple, TypeVar
+
+from csgo.type.price import PriceDetails, PriceEntry, SaleEntry
+
+T = TypeVar('T')
+
+
+# each record replaces the whole entry, so replaying an already compacted journal is harmless
+class Journal(Generic[T]):
+
+    def __init__(self, file_path: str,
+                 to_record: Callable[[str, T], dict],
+                 from_record: Callable[[dict], Tuple[str, T]]) -> None:
+        self.file_path = file_path
+        self.to_record = to_record
+        self.from_record = from_record
+
+    def append(self, entries: Dict[str, T]):
+        if not entries:
+            return
+        with open(self.file_path, 'a') as f:
+            f.writelines(json.dumps(self.to_record(name, entry)) + '\n' for name, entry in entries.items())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self) -> Dict[str, T]:
+        entries: Dict[str, T] = {}
+        if not os.path.exists(self.file_path):
+            return entries
+
+        with open(self.file_path) as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    name, entry = self.from_record(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    # a record cut short by an interrupted write
+                    print(f'[WARN] Skipping journal record {self.file_path}:{line_number}: {e}')
+                    continue
+                entries[name] = entry
+        return entries
+
+    def exists(self) -> bool:
+        return os.path.exists(self.file_path)
+
+    def get_size(self) -> int:
+        return os.path.getsize(self.file_path) if self.exists() else 0
+
+    def clear(self):
+        if self.exists():
+            os.remove(self.file_path)
+
+
+def get_journal_file(file_path: str) -> str:
+    return f'{file_path}.journal'
+
+
+def to_price_record(item_name: str, price_details: PriceDetails) -> dict:
+    return {'n': item_name, 'u': price_details.updated_at,
+            'l': [[p.item_id, p.price, p.float_value, p.withdrawable_in] for p in price_details.prices]}
+
+
+def from_price_record(record: dict) -> Tuple[str, PriceDetails]:
+    item_name = record['n']
+    return item_name, PriceDetails([
+        PriceEntry(item_name, price, float_value, item_id=item_id, withdrawable_in=withdrawable_in)
+        for item_id, price, float_value, withdrawable_in in record['l']
+    ], record['u'])
+
+
+def to_sale_record(item_name: str, sale: SaleEntry) -> dict:
+    return {'n': item_name, 'u': sale.updated_at, 'p': sale.price}
+
+
+def from_sale_record(record: dict) -> Tuple[str, SaleEntry]:
+    return record['n'], SaleEntry(record['n'], record['p'], record['u'])
+
+
+def get_price_journal(file_path: str) -> Journal[PriceDetails]:
+    return Journal(get_journal_file(file_path), to_price_record, from_price_record)
+
+
+def get_sales_journal(file_path: str) -> Journal[SaleEntry]:
+    return Journal(get_journal_file(file_path), to_sale_record, from_sale_record)
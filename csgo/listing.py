@@ -0,0 +1,129 @@
+import hashlib
+import sys
+from typing import Dict, List, Tuple, Iterator, Optional, Union
+
+import numpy as np
+
+from csgo.type.price import ItemPrices, PriceDetails, PriceEntry
+
+
+# arrays are slices of the store columns, sorted by float value
+class Listings:
+    __slots__ = ('market_name', 'prices', 'floats', 'withdrawable_in', 'item_ids')
+
+    def __init__(self, market_name: str, prices: np.ndarray, floats: np.ndarray,
+                 withdrawable_in: np.ndarray, item_ids: np.ndarray) -> None:
+        self.market_name = market_name
+        self.prices = prices
+        self.floats = floats
+        self.withdrawable_in = withdrawable_in
+        self.item_ids = item_ids
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def __getitem__(self, index: Union[slice, np.ndarray]) -> 'Listings':
+        return Listings(self.market_name, self.prices[index], self.floats[index],
+                        self.withdrawable_in[index], self.item_ids[index])
+
+    def __iter__(self) -> Iterator[PriceEntry]:
+        return iter(self.to_price_entries())
+
+    def in_float_range(self, min_value: float, max_value: float) -> 'Listings':
+        # listings without a known float (stored as 0) sort first and never match a range
+        start = max(np.searchsorted(self.floats, min_value, side='left'),
+                    np.searchsorted(self.floats, 0, side='right'))
+        end = np.searchsorted(self.floats, max_value, side='left')
+        return self[start:max(start, end)]
+
+    def cheapest_first(self) -> 'Listings':
+        return self[np.argsort(self.prices, kind='stable')]
+
+    def get_item_id(self, index: int) -> Optional[str]:
+        item_id = self.item_ids[index].decode()
+        return item_id if item_id else None
+
+    def to_price_entries(self) -> List[PriceEntry]:
+        return [PriceEntry(self.market_name, price, float_value,
+                           withdrawable_in=withdrawable_in if withdrawable_in else None,
+                           item_id=self.get_item_id(index))
+                for index, (price, float_value, withdrawable_in)
+                in enumerate(zip(self.prices.tolist(), self.floats.tolist(), self.withdrawable_in.tolist()))]
+
+
+# market names index into [start, end) slices of the columns,
+# unknown withdrawable_in is stored as 0, unknown item id as b''
+class ListingStore:
+
+    def __init__(self, index: Dict[str, Tuple[int, int]], updated_at: Dict[str, Optional[int]],
+                 prices: np.ndarray, floats: np.ndarray, withdrawable_in: np.ndarray, item_ids: np.ndarray) -> None:
+        self.index = index
+        self.updated_at = updated_at
+        self.prices = prices
+        self.floats = floats
+        self.withdrawable_in = withdrawable_in
+        self.item_ids = item_ids
+
+    @classmethod
+    def from_item_prices(cls, item_prices: ItemPrices) -> 'ListingStore':
+        index: Dict[str, Tuple[int, int]] = {}
+        updated_at: Dict[str, Optional[int]] = {}
+        start = 0
+        for market_name, price_details in item_prices.items():
+            index[market_name] = (start, start + len(price_details.prices))
+            updated_at[market_name] = price_details.updated_at
+            start += len(price_details.prices)
+
+        entries = [p for price_details in item_prices.values() for p in price_details.prices]
+        floats = np.array([p.float_value or 0 for p in entries], dtype=np.float64)
+        segments = np.repeat(np.arange(len(index)), [end - start for start, end in index.values()])
+        order = np.lexsort((floats, segments))
+        return cls(index, updated_at,
+                   np.array([p.price for p in entries], dtype=np.float64)[order],
+                   floats[order],
+                   np.array([p.withdrawable_in or 0 for p in entries], dtype=np.int32)[order],
+                   np.array([str(p.item_id).encode() if p.item_id is not None else b'' for p in entries],
+                            dtype=np.bytes_)[order])
+
+    def __contains__(self, market_name: str) -> bool:
+        return market_name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, market_name: str) -> Listings:
+        start, end = self.index.get(market_name, (0, 0))
+        return Listings(market_name, self.prices[start:end], self.floats[start:end],
+                        self.withdrawable_in[start:end], self.item_ids[start:end])
+
+    def get_digest(self, market_name: str) -> bytes:
+        listings = self.get(market_name)
+        digest = hashlib.blake2b(digest_size=16)
+        for column in [listings.prices, listings.floats, listings.withdrawable_in, listings.item_ids]:
+            digest.update(column.tobytes())
+        return digest.digest()
+
+    def to_item_prices(self) -> ItemPrices:
+        return {market_name: PriceDetails(self.get(market_name).to_price_entries(), self.updated_at[market_name])
+                for market_name in self.index}
+
+    @property
+    def nbytes(self) -> int:
+        return self.prices.nbytes + self.floats.nbytes + self.withdrawable_in.nbytes + self.item_ids.nbytes
+
+    def get_memory_footprint(self) -> int:
+        return self.nbytes + get_object_size(self.index) + get_object_size(self.updated_at)
+
+
+def get_object_size(obj, seen: set = None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(get_object_size(k, seen) + get_object_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(get_object_size(i, seen) for i in obj)
+    return size
@@ -1,23 +1,42 @@
+import hashlib
 import html
 import json
 import math
+import os
+import time
 from abc import ABC, abstractmethod
-from functools import reduce
+from functools import reduce, cached_property
 from statistics import mean
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Iterable, Set, Tuple, AbstractSet
 
+import numpy as np
 import yaml
 
 from csgo.collection import get_next_level_items, get_prev_level_items
-from csgo.type.item import Item, ItemCollection, ItemCondition, ItemRarity
+from csgo.journal import get_sales_journal
+from csgo.listing import ListingStore, Listings
+from csgo.snapshot import load_price_listings
+from csgo.type.item import Item, ItemCollection, ItemCondition, ItemRarity, ItemWithCondition, to_st_track, \
+    items_by_id
 from csgo.type.price import STPrices, PriceTimeRange, STItemPriceDetails, STItemPrice, \
     get_price_time_range_from_bck_string, \
     get_price_time_range_from_hexa_string, get_market_name, PriceEntry, ItemPrices, \
-    ItemSales, SaleEntry, PriceDetails
+    ItemSales, SaleEntry, PriceDetailsBuilder
+from csgo.util import JSONObjectStream
 
 RarityConditionIncreasePriceRatios = Dict[ItemRarity, Dict[ItemCondition, float]]
 RarityItemMap = Dict[ItemRarity, Optional[Item]]
 
+bck_prices_file = os.path.join('csgo', 'bck_prices.json')
+hexa_prices_file = os.path.join('csgo', 'hexa_prices.json')
+lf_prices_file = os.path.join('csgo', 'lf', 'lf_prices.json')
+lf_auctions_file = os.path.join('csgo', 'lf', 'lf_auctions.json')
+lf_sales_file = os.path.join('csgo', 'lf', 'lf_sales.json')
+bs_prices_file = os.path.join('csgo', 'bs', 'bs_prices.npz')
+bs_sales_file = os.path.join('csgo', 'bs', 'bs_sales.yaml')
+dm_prices_file = os.path.join('csgo', 'dm', 'dm_prices.npz')
+dm_sales_file = os.path.join('csgo', 'dm', 'dm_sales.yaml')
+
 
 def trim_mean(tlist, tperc) -> float:
     remove_n = int(math.floor(len(tlist) * tperc / 2))
@@ -28,9 +47,11 @@ def trim_mean(tlist, tperc) -> float:
 
 
 class PriceManager(ABC):
+    # files load() reads, updaters write journals next to them
+    source_files: List[str] = []
 
     def __init__(self) -> None:
-        self.prices: ItemPrices = None
+        self.listings: ListingStore = None
         self.sales: ItemSales = None
 
     def get_avg_price(self, item: Item, item_condition: ItemCondition,
@@ -41,9 +62,20 @@ class PriceManager(ABC):
 
         return p.price if p else None
 
-    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> List[PriceEntry]:
-        item_name = get_market_name(item.full_name, item_condition)
-        return self.prices[item_name].prices if self.prices.get(item_name) and self.prices[item_name].prices else []
+    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> Listings:
+        return self.listings.get(get_market_name(item, item_condition))
+
+    def get_items_on_sale_in_range(self, item: Item, item_condition: ItemCondition,
+                                   min_float: float, max_float: float) -> Listings:
+        return self.get_items_on_sale(item, item_condition).in_float_range(min_float, max_float).cheapest_first()
+
+    def get_price_digests(self) -> Dict[str, bytes]:
+        listings = self.listings.index if self.listings else {}
+        sales = self.sales or {}
+        return {market_name: hashlib.blake2b(
+            (self.listings.get_digest(market_name) if market_name in listings else b'') +
+            repr(sales[market_name].price if market_name in sales else None).encode(), digest_size=16).digest()
+            for market_name in {*listings, *sales}}
 
     @abstractmethod
     def load(self):
@@ -52,7 +84,7 @@ class PriceManager(ABC):
 
 class STPriceManager(PriceManager):
 
-    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> List[PriceEntry]:
+    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> Listings:
         pass
 
     def load(self):
@@ -62,29 +94,72 @@ class STPriceManager(PriceManager):
         super().__init__()
         self._prices: STPrices = prices
         self.collections = collections
-        self.condition_increase_ratios = self.calculate_condition_increase_price_ratios()
+        self._approximations: Dict[PriceTimeRange, PriceApproximations] = {}
 
-    def calculate_condition_increase_price_ratios(self,
-                                                  time_range: PriceTimeRange = PriceTimeRange.DAYS_30) -> RarityConditionIncreasePriceRatios:
-        conditions: List[ItemCondition] = list(ItemCondition)
+    @cached_property
+    def price_matrix(self) -> 'PriceMatrix':
+        return PriceMatrix.from_prices(self._prices, self.collections)
 
-        res: Dict[ItemRarity, Dict[ItemCondition, List[float]]] = {}
+    @cached_property
+    def market_name_items(self) -> Dict[str, Set[Item]]:
+        res: Dict[str, Set[Item]] = {}
         for collection in self.collections.values():
             for item in collection.items:
-                for condition in conditions[0:len(conditions) - 1]:
-                    price = self.get_avg_price(item, condition, time_range)
-                    if price:
-                        next_condition_price = self.get_avg_price(item, ItemCondition(condition.value + 1), time_range)
-                        if next_condition_price:
-                            rarity = ItemRarity(item.rarity)
-                            if rarity not in res:
-                                res[rarity] = {}
-                            if condition not in res[rarity]:
-                                res[rarity][condition] = [price / next_condition_price]
-                            else:
-                                res[rarity][condition].append(price / next_condition_price)
-
-        return {rarity: {cond: mean(ratios) for cond, ratios in res[rarity].items()} for rarity in res}
+                for i in [item, to_st_track(item)]:
+                    for item_condition in ItemCondition:
+                        res.setdefault(get_market_name(i, item_condition), set()).add(i)
+        return res
+
+    @cached_property
+    def condition_increase_ratios(self) -> RarityConditionIncreasePriceRatios:
+        return self.calculate_condition_increase_price_ratios()
+
+    def set_prices(self, prices: STPrices):
+        self._prices = prices
+        self._approximations = {}
+        self.__dict__.pop('price_matrix', None)
+        self.__dict__.pop('condition_increase_ratios', None)
+
+    def update_prices(self, prices: STPrices):
+        # only approximations reading the changed prices are dropped
+        self._prices = {**self._prices, **prices}
+        if 'price_matrix' in self.__dict__:
+            self.price_matrix.update(prices)
+        items = {i for market_name in prices for i in self.market_name_items.get(market_name, ())}
+        if items:
+            self.__dict__.pop('condition_increase_ratios', None)
+        for approximations in self._approximations.values():
+            approximations.invalidate(items)
+
+    def get_approximations(self, time_range: PriceTimeRange) -> 'PriceApproximations':
+        approximations = self._approximations.get(time_range)
+        if approximations is None:
+            approximations = self._approximations.setdefault(time_range, PriceApproximations(self, time_range))
+        return approximations
+
+    def calculate_condition_increase_price_ratios(self,
+                                                  time_range: PriceTimeRange = PriceTimeRange.DAYS_30) -> RarityConditionIncreasePriceRatios:
+        items = [i for c in self.collections.values() for i in c.items]
+        rarities = np.array([i.rarity for i in items], dtype=np.int8)
+        prices = self.price_matrix.fallback_prices[[i.id for i in items], :, time_range]
+        # price of each condition over the next better one, NaN unless both are known
+        ratios = prices[:, :-1] / prices[:, 1:]
+        known = ~np.isnan(ratios)
+
+        res: RarityConditionIncreasePriceRatios = {}
+        for rarity in np.unique(rarities).tolist():
+            rarity_known = known[rarities == rarity]
+            counts = rarity_known.sum(axis=0)
+            sums = np.where(rarity_known, ratios[rarities == rarity], 0).sum(axis=0)
+            cond_ratios = {ItemCondition(cond): float(sums[cond] / counts[cond])
+                           for cond in range(len(counts)) if counts[cond]}
+            if cond_ratios:
+                res[ItemRarity(rarity)] = cond_ratios
+        return res
+
+    def get_price_digests(self) -> Dict[str, bytes]:
+        return {market_name: hashlib.blake2b(repr(p.prices).encode(), digest_size=16).digest()
+                for market_name, p in self._prices.items()}
 
     def find_lowest_price_items(self, collection_name: str,
                                 item_condition: ItemCondition,
@@ -111,7 +186,15 @@ class STPriceManager(PriceManager):
                       item_condition: ItemCondition,
                       time_range: PriceTimeRange = PriceTimeRange.DAYS_30,
                       with_price_fallback: bool = True) -> Optional[float]:
-        name = get_market_name(item.full_name, item_condition)
+        try:
+            return self.price_matrix.get(item.id, item_condition, time_range, with_price_fallback)
+        except IndexError:
+            # interned after the matrix was built
+            return self.get_entry_avg_price(item, item_condition, time_range, with_price_fallback)
+
+    def get_entry_avg_price(self, item: Item, item_condition: ItemCondition, time_range: PriceTimeRange,
+                            with_price_fallback: bool = True) -> Optional[float]:
+        name = get_market_name(item, item_condition)
         p = self._prices.get(name)
         if p is not None:
             time_ranges = [t for t in PriceTimeRange if t >= time_range] if with_price_fallback else [time_range]
@@ -124,7 +207,7 @@ class STPriceManager(PriceManager):
     def get_sold(self, item: Item,
                  item_condition: ItemCondition,
                  time_range: PriceTimeRange = PriceTimeRange.DAYS_30) -> Optional[int]:
-        name = get_market_name(item.full_name, item_condition)
+        name = get_market_name(item, item_condition)
         p = self._prices.get(name)
         if p is not None:
             return int(p.prices[time_range].sold) if time_range in p.prices and p.prices[time_range].sold else None
@@ -134,7 +217,7 @@ class STPriceManager(PriceManager):
     def get_std(self, item: Item,
                 item_condition: ItemCondition,
                 time_range: PriceTimeRange = PriceTimeRange.DAYS_30) -> Optional[float]:
-        name = get_market_name(item.full_name, item_condition)
+        name = get_market_name(item, item_condition)
         p = self._prices.get(name)
         if p is not None:
             return p.prices[time_range].standard_deviation if time_range in p.prices else None
@@ -144,39 +227,139 @@ class STPriceManager(PriceManager):
     def get_approx_price(self, item: Item,
                          item_condition: ItemCondition,
                          price_time_range: PriceTimeRange = PriceTimeRange.DAYS_30) -> Optional[float]:
-        next_items = get_next_level_items(item, self.collections[item.collection_name])
-        prev_items = get_prev_level_items(item, self.collections[item.collection_name])
-        price_ratios: Dict[Item, List[float]] = {}
-
-        for condition in ItemCondition:
-            if condition != item_condition:
-                item_price = self.get_avg_price(item, condition, price_time_range)
-                if item_price:
-                    for n_item in next_items:
-                        n_item_price = self.get_avg_price(n_item, condition, price_time_range)
-                        if n_item_price:
-                            if n_item not in price_ratios:
-                                price_ratios[n_item] = []
-                            price_ratios[n_item].append(item_price / n_item_price)
-                    for p_item in prev_items:
-                        p_item_price = self.get_avg_price(p_item, condition, price_time_range)
-                        if p_item_price:
-                            if p_item not in price_ratios:
-                                price_ratios[p_item] = []
-                            price_ratios[p_item].append(item_price / p_item_price)
+        return self.get_approximations(price_time_range).get_approx_price(item, item_condition)
 
+    def get_approx_price_from_rarity(self, item: Item, item_condition: ItemCondition,
+                                     price_time_range: PriceTimeRange) -> Optional[float]:
+        return self.get_approximations(price_time_range).get_approx_price_from_rarity(item, item_condition)
+
+
+# items x conditions x time ranges averages indexed by item id, NaN when unknown;
+# fallback_prices fall back to longer time ranges, single prices are read from the nested lists
+class PriceMatrix:
+
+    def __init__(self, prices: np.ndarray, fallback_prices: np.ndarray,
+                 market_names: Dict[str, List[Tuple[int, ItemCondition]]]) -> None:
+        self.prices = prices
+        self.fallback_prices = fallback_prices
+        self.market_names = market_names
+        self._rows: List[List[List[float]]] = prices.tolist()
+        self._fallback_rows: List[List[List[float]]] = fallback_prices.tolist()
+
+    @classmethod
+    def from_prices(cls, prices: STPrices, collections: Dict[str, ItemCollection]) -> 'PriceMatrix':
+        # intern the ST variants up front, so they get a row too
+        for collection in collections.values():
+            if collection.st_track:
+                for item in collection.items:
+                    to_st_track(item)
+
+        items = list(items_by_id)
+        market_names: Dict[str, List[Tuple[int, ItemCondition]]] = {}
+        averages = np.full((len(items), len(ItemCondition), len(PriceTimeRange)), np.nan)
+        for item in items:
+            for cond in ItemCondition:
+                market_name = get_market_name(item, cond)
+                market_names.setdefault(market_name, []).append((item.id, cond))
+                p = prices.get(market_name)
+                if p is not None:
+                    averages[item.id, cond] = get_averages(p)
+        return cls(averages, get_fallback_averages(averages), market_names)
+
+    def get(self, item_id: int, item_condition: ItemCondition, time_range: PriceTimeRange,
+            with_price_fallback: bool = True) -> Optional[float]:
+        rows = self._fallback_rows if with_price_fallback else self._rows
+        price = rows[item_id][item_condition][time_range]
+        return None if price != price else price
+
+    def update(self, prices: STPrices):
+        for market_name, p in prices.items():
+            averages = get_averages(p)
+            fallback_averages = get_fallback_averages(averages)
+            for item_id, cond in self.market_names.get(market_name, ()):
+                self.prices[item_id, cond] = averages
+                self.fallback_prices[item_id, cond] = fallback_averages
+                self._rows[item_id][cond] = averages.tolist()
+                self._fallback_rows[item_id][cond] = fallback_averages.tolist()
+
+
+def get_averages(p: STItemPrice) -> np.ndarray:
+    averages = np.full(len(PriceTimeRange), np.nan)
+    for t_range, details in p.prices.items():
+        if details.average:
+            averages[t_range] = details.average
+    return averages
+
+
+def get_fallback_averages(averages: np.ndarray) -> np.ndarray:
+    res = averages.copy()
+    for t_range in reversed(range(len(PriceTimeRange) - 1)):
+        res[..., t_range] = np.where(np.isnan(res[..., t_range]), res[..., t_range + 1], res[..., t_range])
+    return res
+
+
+# memoized approximations of a single time range, dropped when prices of one of their items change
+class PriceApproximations:
+
+    def __init__(self, price_manager: STPriceManager, time_range: PriceTimeRange) -> None:
+        self.price_manager = price_manager
+        self.time_range = time_range
+        self._condition_prices: Dict[Item, Dict[ItemCondition, Optional[float]]] = {}
+        self._neighbours: Dict[Item, List[Item]] = {}
+        self._ratios: Dict[Tuple[Item, Item], Dict[ItemCondition, float]] = {}
+        self._approx_prices: Dict[ItemWithCondition, Optional[float]] = {}
+        self._rarity_approx_prices: Dict[ItemWithCondition, Optional[float]] = {}
+
+    def get_condition_prices(self, item: Item) -> Dict[ItemCondition, Optional[float]]:
+        prices = self._condition_prices.get(item)
+        if prices is None:
+            prices = self._condition_prices[item] = {
+                cond: self.price_manager.get_avg_price(item, cond, self.time_range) for cond in ItemCondition}
+        return prices
+
+    def get_neighbours(self, item: Item) -> List[Item]:
+        neighbours = self._neighbours.get(item)
+        if neighbours is None:
+            collection = self.price_manager.collections[item.collection_name]
+            neighbours = self._neighbours[item] = (get_next_level_items(item, collection) +
+                                                   get_prev_level_items(item, collection))
+        return neighbours
+
+    def get_ratios(self, item: Item, ref_item: Item) -> Dict[ItemCondition, float]:
+        ratios = self._ratios.get((item, ref_item))
+        if ratios is None:
+            item_prices = self.get_condition_prices(item)
+            ref_item_prices = self.get_condition_prices(ref_item)
+            ratios = self._ratios[(item, ref_item)] = {
+                cond: item_prices[cond] / ref_item_prices[cond]
+                for cond in ItemCondition if item_prices[cond] and ref_item_prices[cond]}
+        return ratios
+
+    def get_approx_price(self, item: Item, item_condition: ItemCondition) -> Optional[float]:
+        key = (item, item_condition)
+        if key not in self._approx_prices:
+            self._approx_prices[key] = self.calculate_approx_price(item, item_condition)
+        return self._approx_prices[key]
+
+    def calculate_approx_price(self, item: Item, item_condition: ItemCondition) -> Optional[float]:
         item_approx_prices: List[float] = []
-        for ref_item, ref_ratios in price_ratios.items():
-            ref_item_price = self.get_avg_price(ref_item, item_condition, price_time_range)
-            if ref_item_price:
+        for ref_item in self.get_neighbours(item):
+            ref_ratios = [ratio for cond, ratio in self.get_ratios(item, ref_item).items() if cond != item_condition]
+            ref_item_price = self.get_condition_prices(ref_item)[item_condition]
+            if ref_ratios and ref_item_price:
                 item_approx_prices.append(ref_item_price * mean(ref_ratios))
         return mean(item_approx_prices) if item_approx_prices else None
 
-    def get_approx_price_from_rarity(self, item: Item, item_condition: ItemCondition,
-                                     price_time_range: PriceTimeRange) -> Optional[float]:
-        ratio = self.condition_increase_ratios[ItemRarity(item.rarity)]
+    def get_approx_price_from_rarity(self, item: Item, item_condition: ItemCondition) -> Optional[float]:
+        key = (item, item_condition)
+        if key not in self._rarity_approx_prices:
+            self._rarity_approx_prices[key] = self.calculate_approx_price_from_rarity(item, item_condition)
+        return self._rarity_approx_prices[key]
+
+    def calculate_approx_price_from_rarity(self, item: Item, item_condition: ItemCondition) -> Optional[float]:
+        ratio = self.price_manager.condition_increase_ratios[ItemRarity(item.rarity)]
         conditions: List[ItemCondition] = list(ItemCondition)
-        cond_prices = {cond: self.get_avg_price(item, cond, price_time_range) for cond in conditions}
+        cond_prices = self.get_condition_prices(item)
 
         left_prices = [cond for cond in conditions if cond < item_condition and cond_prices[cond]]
         left_ref_cond = left_prices[-1] if left_prices else None
@@ -201,35 +384,62 @@ class STPriceManager(PriceManager):
                      ([approx_price_right] if approx_price_right else []))
                 if approx_price_left or approx_price_right else None)
 
+    def invalidate(self, items: Iterable[Item]):
+        items = set(items)
+        if items:
+            # condition increase ratios are averaged over all the collection items
+            self._rarity_approx_prices = {}
+        for item in items:
+            affected = [item] + self.get_neighbours(item)
+            self._condition_prices.pop(item, None)
+            for neighbour in affected[1:]:
+                self._ratios.pop((item, neighbour), None)
+                self._ratios.pop((neighbour, item), None)
+            for i in affected:
+                for cond in ItemCondition:
+                    self._approx_prices.pop((i, cond), None)
+
 
 class HXPriceManager(STPriceManager):
+    source_files = [hexa_prices_file]
+
+    def __init__(self, collections: Dict[str, ItemCollection]) -> None:
+        super().__init__({}, collections)
 
-    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> List[PriceEntry]:
+    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> Listings:
         raise NotImplementedError()
 
     def load(self):
-        self._prices = load_hexa_prices()
+        self.set_prices(load_hexa_prices(self.market_name_items.keys()))
+        # resolve the price fallbacks while loading rather than on the first lookup
+        self.price_matrix
         return self
 
 
 class BCKPriceManager(STPriceManager):
+    source_files = [bck_prices_file]
 
-    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> List[PriceEntry]:
+    def __init__(self, collections: Dict[str, ItemCollection]) -> None:
+        super().__init__({}, collections)
+
+    def get_items_on_sale(self, item: Item, item_condition: ItemCondition) -> Listings:
         raise NotImplementedError()
 
     def load(self):
-        self._prices = load_bck_prices()
+        self.set_prices(load_bck_prices(self.market_name_items.keys()))
+        self.price_matrix
         return self
 
 
 class LFPriceManager(PriceManager):
+    source_files = [lf_prices_file, lf_auctions_file, lf_sales_file]
 
     def get_available(self, item: Item, item_condition: ItemCondition) -> Optional[int]:
         raise NotImplementedError()
 
     def load(self):
         self.load_sales()
-        self.prices = load_lf_prices()
+        self.listings = ListingStore.from_item_prices(load_lf_prices())
         return self
 
     def load_sales(self):
@@ -238,22 +448,25 @@ class LFPriceManager(PriceManager):
 
 
 class BSPriceManager(PriceManager):
+    source_files = [bs_prices_file, bs_sales_file]
 
     def load(self):
-        self.prices = load_bs_prices()
+        self.listings = load_bs_prices()
         self.sales = load_bs_sales()
         return self
 
 
 class DMPriceManager(PriceManager):
+    source_files = [dm_prices_file, dm_sales_file]
 
     def load(self):
         self.sales = load_dm_sales()
-        self.prices = load_dm_prices()
+        self.listings = load_dm_prices()
         return self
 
 
-def load_bck_prices() -> STPrices:
+def load_bck_prices(market_names: AbstractSet[str] = None, file_path: str = bck_prices_file) -> STPrices:
+
     def get_price_details(price: dict) -> STItemPriceDetails:
         return STItemPriceDetails(average=float(price['average']),
                                   sold=price['sold'],
@@ -263,24 +476,29 @@ def load_bck_prices() -> STPrices:
                                   lowest_price=price.get('lowest_price'),
                                   highest_price=price.get('highest_price'))
 
-    with open('csgo/bck_prices.json') as f:
-        res = json.loads(f.read())
-        if not res.get('success'):
-            raise AssertionError('Prices response was not successful')
-
+    start = time.perf_counter()
+    with open(file_path) as f:
+        stream = JSONObjectStream(f, ['items_list'])
+        parsed = 0
         prices: STPrices = {}
-        for item_name_escaped, price_obj in res['items_list'].items():
+        for item_name_escaped, price_obj in stream:
+            parsed += 1
             item_name = html.unescape(item_name_escaped)
+            if market_names is not None and item_name not in market_names:
+                continue
             prices[item_name] = STItemPrice(item_name, {
                 get_price_time_range_from_bck_string(price_key): get_price_details(price_details)
                 for price_key, price_details in price_obj.get('price', {}).items()
                 if get_price_time_range_from_bck_string(price_key)
             })
+        if not stream.values.get('success'):
+            raise AssertionError('Prices response was not successful')
 
-        return prices
+    print_parse_throughput(file_path, parsed, len(prices), time.perf_counter() - start)
+    return prices
 
 
-def load_hexa_prices() -> STPrices:
+def load_hexa_prices(market_names: AbstractSet[str] = None, file_path: str = hexa_prices_file) -> STPrices:
     def get_price_details(price: dict) -> STItemPriceDetails:
         return STItemPriceDetails(average=float(price['avg']),
                                   sold=price.get('sales'),
@@ -289,40 +507,49 @@ def load_hexa_prices() -> STPrices:
                                   lowest_price=price.get('min'),
                                   highest_price=price.get('max'))
 
-    with open('csgo/hexa_prices.json') as f:
-        res = json.loads(f.read())
-
+    start = time.perf_counter()
+    with open(file_path) as f:
+        parsed = 0
         prices: STPrices = {}
-        for item_name, price_obj in res['result']['prices'].items():
+        for item_name, price_obj in JSONObjectStream(f, ['result', 'prices']):
+            parsed += 1
+            if market_names is not None and item_name not in market_names:
+                continue
             prices[item_name] = STItemPrice(item_name, {
                 get_price_time_range_from_hexa_string(price_key): get_price_details(price_details)
                 for price_key, price_details in price_obj.items()
                 if get_price_time_range_from_hexa_string(price_key)
             })
 
-        return prices
+    print_parse_throughput(file_path, parsed, len(prices), time.perf_counter() - start)
+    return prices
 
 
-def load_lf_prices() -> ItemPrices:
-    prices: ItemPrices = {}
+def print_parse_throughput(file_path: str, parsed: int, kept: int, seconds: float):
+    size_mb = os.path.getsize(file_path) / 1024 / 1024
+    print(f'Parsed {file_path} ({size_mb:.1f}MB) in {seconds:.2f}s ({size_mb / max(seconds, 1e-9):.1f}MB/s), '
+          f'kept {kept}/{parsed} market names')
+
 
-    with open('csgo/lf/lf_prices.json') as p, open('csgo/lf/lf_auctions.json') as a:
+def load_lf_prices() -> ItemPrices:
+    with open(lf_prices_file) as p, open(lf_auctions_file) as a:
         p_data = json.loads(p.read())
         a_data = json.loads(a.read())
-        p_updated_at = p_data.get('timestamp')
-        a_updated_at = a_data.get('timestamp')
-        prices = to_lf_price_entries(p_data['result'], p_updated_at)
-        lf_auctions = to_lf_price_entries(a_data['result'], a_updated_at)
-        for item_name, price_details in lf_auctions.items():
-            if item_name not in prices:
-                prices[item_name] = PriceDetails([], a_updated_at)
-            prices[item_name] = PriceDetails(prices[item_name].prices + price_details.prices, a_updated_at)
 
-    return prices
+    builder = PriceDetailsBuilder()
+    add_lf_price_entries(builder, p_data['result'], p_data.get('timestamp'))
+    # auctions follow the listings of the same market name
+    add_lf_price_entries(builder, a_data['result'], a_data.get('timestamp'))
+    return builder.build()
 
 
 def to_lf_price_entries(data: dict, updated_at: int = None) -> ItemPrices:
-    prices: ItemPrices = {}
+    builder = PriceDetailsBuilder()
+    add_lf_price_entries(builder, data, updated_at)
+    return builder.build()
+
+
+def add_lf_price_entries(builder: PriceDetailsBuilder, data: dict, updated_at: int = None):
     for item_details in data.values():
         item_n = item_details.get('n')
         item_e = item_details.get('e')
@@ -346,14 +573,11 @@ def to_lf_price_entries(data: dict, updated_at: int = None) -> ItemPrices:
                     item_price = float(item_pst / 100) if item_st else float(item_p / 100)
                     p = PriceEntry(market_name, item_price, item_float, item_rarity,
                                    item_name=item_n, withdrawable_in=item_td)
-                    if market_name not in prices:
-                        prices[market_name] = PriceDetails([], updated_at)
-                    prices[market_name] = PriceDetails(prices[market_name].prices + [p], updated_at)
-    return prices
+                    builder.add(market_name, (p,), updated_at)
 
 
 def load_lf_sales() -> ItemSales:
-    with open('csgo/lf/lf_sales.json') as f:
+    with open(lf_sales_file) as f:
         data = json.loads(f.read())
 
         prices: ItemSales = {}
@@ -364,41 +588,32 @@ def load_lf_sales() -> ItemSales:
         return prices
 
 
-def load_item_prices(file_path: str) -> ItemPrices:
-    with open(file_path) as f:
-        data = yaml.load(f, Loader=yaml.SafeLoader)
-
-        return {
-            item_name: PriceDetails([
-                PriceEntry(item_name, float(price_details['p']), float(price_details['f']),
-                           item_id=item_id, withdrawable_in=price_details.get('w'))
-                for item_id, price_details in item_details.get('prices', {}).items()
-                if price_details.get('p') and price_details.get('f')
-            ], item_details.get('u')) for item_name, item_details in data.get('items', {}).items()
-        }
-
-
 def load_item_sales(file_path: str) -> ItemSales:
+    journal = get_sales_journal(file_path)
+    if not os.path.exists(file_path) and journal.exists():
+        return journal.replay()
+
     with open(file_path) as f:
         data = yaml.load(f, Loader=yaml.SafeLoader)
 
         return {
-            item_name: SaleEntry(item_name, item_details.get('p'), item_details['u'])
-            for item_name, item_details in data.get('sales', {}).items()
+            **{item_name: SaleEntry(item_name, item_details.get('p'), item_details['u'])
+               for item_name, item_details in data.get('sales', {}).items()},
+            **journal.replay()
         }
 
 
-def load_bs_prices() -> ItemPrices:
-    return load_item_prices('csgo/bs/bs_prices.yaml')
+def load_bs_prices() -> ListingStore:
+    return load_price_listings(bs_prices_file)
 
 
 def load_bs_sales() -> ItemSales:
-    return load_item_sales('csgo/bs/bs_sales.yaml')
+    return load_item_sales(bs_sales_file)
 
 
-def load_dm_prices() -> ItemPrices:
-    return load_item_prices('csgo/dm/dm_prices.yaml')
+def load_dm_prices() -> ListingStore:
+    return load_price_listings(dm_prices_file)
 
 
 def load_dm_sales() -> ItemSales:
-    return load_item_sales('csgo/dm/dm_sales.yaml')
+    return load_item_sales(dm_sales_file)
@@ -1,37 +1,72 @@
-import sys
+from argparse import ArgumentParser, Namespace
 
-from csgo.collection import load_collections
 from csgo.contract import get_best_contracts, to_contract_item
+from csgo.conversion import load_compiled_collections
+from csgo.instrument import instrumentation, add_instrumentation_args, instrumented
 from csgo.inventory import LFInventoryManager, DMInventoryManager
 from csgo.price import BSPriceManager, LFPriceManager, DMPriceManager
 from csgo.type.model import Model
 
-model = Model.from_str(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] else Model.LF
-if not model:
-    raise AssertionError(f'Could not determine model from string value \'{sys.argv[1]}\'')
-else:
-    print(f'Loading model {model.name}')
-withdrawable_in = int(sys.argv[2]) if len(sys.argv) > 2 else None
-collections = load_collections()
-
-if model == Model.BS:
-    price_manager = BSPriceManager().load()
-    buy_adjustment = 1
-    commission = 0.1
-    items = {}
-if model == Model.LF:
-    price_manager = LFPriceManager().load_sales()
-    buy_adjustment = 1.05
-    commission = 0.05
-    items = set([to_contract_item(i, collections) for i in LFInventoryManager().get_inventory()])
-if model == Model.DM:
-    price_manager = DMPriceManager().load()
-    buy_adjustment = 1
-    commission = 0.05
-    items = set([to_contract_item(i, collections) for i in DMInventoryManager().get_inventory()])
-
-print(f'Loaded {len(items)} items')
-print('Calculating contracts')
-
-get_best_contracts(items, price_manager, collections, buy_adjustment, commission,
-                   strict=True, withdrawable_in=withdrawable_in)
+
+def get_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument('model', type=str, nargs='?', default='lf')
+    parser.add_argument('withdrawable_in', type=int, nargs='?')
+    parser.add_argument('--exhaustive', action='store_true')
+    parser.add_argument('-w', '--workers', type=int, help='worker processes of the exhaustive search')
+    parser.add_argument('-n', '--top', type=int, default=1)
+    add_instrumentation_args(parser)
+
+    args = parser.parse_args()
+    if args.workers and not args.exhaustive:
+        parser.error('--workers requires --exhaustive')
+    return args
+
+
+def recommend(args: Namespace):
+    model = Model.from_str(args.model)
+    if not model:
+        raise AssertionError(f'Could not determine model from string value \'{args.model}\'')
+    else:
+        print(f'Loading model {model.name}')
+    withdrawable_in = args.withdrawable_in
+    collections, conversion_map = load_compiled_collections()
+
+    with instrumentation.timer('prices.load'):
+        if model == Model.BS:
+            price_manager = BSPriceManager().load()
+            buy_adjustment = 1
+            commission = 0.1
+        if model == Model.LF:
+            price_manager = LFPriceManager().load_sales()
+            buy_adjustment = 1.05
+            commission = 0.05
+        if model == Model.DM:
+            price_manager = DMPriceManager().load()
+            buy_adjustment = 1
+            commission = 0.05
+
+    with instrumentation.timer('inventory.load'):
+        if model == Model.BS:
+            items = {}
+        if model == Model.LF:
+            items = set([to_contract_item(i, collections) for i in LFInventoryManager().get_inventory()])
+        if model == Model.DM:
+            items = set([to_contract_item(i, collections) for i in DMInventoryManager().get_inventory()])
+
+    print(f'Loaded {len(items)} items')
+    print('Calculating contracts')
+
+    get_best_contracts(items, price_manager, collections, buy_adjustment, commission,
+                       strict=True, withdrawable_in=withdrawable_in, exhaustive=args.exhaustive, workers=args.workers,
+                       top=args.top, conversion_map=conversion_map)
+
+
+def main():
+    args = get_args()
+    with instrumented(args, 'reco'):
+        recommend(args)
+
+
+if __name__ == '__main__':
+    main()
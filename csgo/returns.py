@@ -0,0 +1,168 @@
+import os
+import pickle
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import Dict, Set, Tuple, List, Iterable, NamedTuple, Optional, Callable
+
+from csgo.collection import get_next_level_items
+from csgo.contract import ItemReturnCalc
+from csgo.conversion import ConversionMap, get_item_possible_conditions, get_item_to_item_conversions
+from csgo.instrument import instrumentation
+from csgo.price import PriceManager
+from csgo.type.contract import ItemReturn
+from csgo.type.float import FloatRange
+from csgo.type.item import Item, ItemCondition, ItemCollection
+from csgo.type.price import PriceTimeRange, get_market_name
+
+ReturnKey = Tuple[Item, ItemCondition]
+ReturnId = Tuple[Item, ItemCondition, FloatRange, Optional[float], Optional[str]]
+
+# bump whenever the pickled structures (ItemReturn, ReturnKey) change shape or the return logic changes
+# (contract returns, price lookups), the signature only covers the calculator settings
+returns_cache_version = 1
+
+
+# market name -> (item, condition) returns reading its listings, sales or outcome prices
+class ReturnDependencies:
+
+    def __init__(self, dependencies: Dict[ReturnKey, Set[str]]) -> None:
+        self.dependencies = dependencies
+        self.dependents: Dict[str, Set[ReturnKey]] = {}
+        for key, market_names in dependencies.items():
+            for market_name in market_names:
+                self.dependents.setdefault(market_name, set()).add(key)
+
+    @classmethod
+    def from_conversion_map(cls, items: Iterable[Item], conversion_map: ConversionMap) -> 'ReturnDependencies':
+        dependencies: Dict[ReturnKey, Set[str]] = {}
+        for item in items:
+            for conversion_range, conversion_items in conversion_map.get_rules(item).items():
+                key = (item, conversion_range.item_condition)
+                dependencies.setdefault(key, {get_market_name(item, key[1])}).update(
+                    get_market_name(c_item, c_item_condition)
+                    for c_item, c_item_condition in conversion_items.items())
+        return cls(dependencies)
+
+    @classmethod
+    def from_collections(cls, items: Iterable[Item],
+                         collections: Dict[str, ItemCollection]) -> 'ReturnDependencies':
+        dependencies: Dict[ReturnKey, Set[str]] = {}
+        for item in items:
+            next_items = get_next_level_items(item, collections[item.collection_name])
+            for item_condition in get_item_possible_conditions(item):
+                dependencies[(item, item_condition)] = {get_market_name(item, item_condition)} | {
+                    get_market_name(n_item, n_item_condition)
+                    for n_item in next_items
+                    for n_item_condition in get_item_to_item_conversions(item, item_condition, n_item)}
+        return cls(dependencies)
+
+    def __len__(self) -> int:
+        return len(self.dependencies)
+
+    def get_affected(self, market_names: Iterable[str]) -> Set[ReturnKey]:
+        return {key for market_name in market_names for key in self.dependents.get(market_name, ())}
+
+
+class CachedReturns(NamedTuple):
+    version: int
+    signature: str
+    price_digests: Dict[str, bytes]
+    returns: Dict[ReturnKey, List[ItemReturn]]
+
+
+class ReturnsEvaluation(NamedTuple):
+    returns: List[ItemReturn]
+    changed_market_names: Set[str]
+    recomputed: int
+    total: int
+    seconds: float
+
+    def __str__(self) -> str:
+        return (f'{len(self.changed_market_names)} market names changed, '
+                f'{self.recomputed}/{self.total} item returns recomputed in {self.seconds * 1000:.0f}ms')
+
+
+# item returns cached on disk with the price digests they were computed from,
+# only returns of market names with changed digests are recomputed
+class IncrementalReturns:
+
+    def __init__(self, calc: ItemReturnCalc, dependencies: ReturnDependencies, price_manager: PriceManager,
+                 time_range: PriceTimeRange, file_path: str, signature: str, workers: int = 10) -> None:
+        self.calc = calc
+        self.dependencies = dependencies
+        self.price_manager = price_manager
+        self.time_range = time_range
+        self.file_path = file_path
+        self.signature = signature
+        self.workers = workers
+        self.cached: Optional[CachedReturns] = None
+
+    @instrumentation.timed('returns.evaluate')
+    def evaluate(self) -> ReturnsEvaluation:
+        start = time.perf_counter()
+        price_digests = self.price_manager.get_price_digests()
+        cached = self.cached or self.read()
+        if cached:
+            changed = {market_name for market_name in {*price_digests, *cached.price_digests}
+                       if price_digests.get(market_name) != cached.price_digests.get(market_name)}
+            returns = {key: r for key, r in cached.returns.items() if key in self.dependencies.dependencies}
+        else:
+            changed = set(price_digests)
+            returns = {}
+        affected = self.dependencies.get_affected(changed) | (self.dependencies.dependencies.keys() - returns.keys())
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            returns.update(zip(affected, executor.map(self.get_returns, affected)))
+        instrumentation.count('returns.recomputed', len(affected))
+        instrumentation.count('returns.cached', len(self.dependencies) - len(affected))
+
+        self.cached = CachedReturns(returns_cache_version, self.signature, price_digests, returns)
+        self.save(self.cached)
+        return ReturnsEvaluation([r for key_returns in returns.values() for r in key_returns], changed,
+                                 len(affected), len(self.dependencies), time.perf_counter() - start)
+
+    def get_returns(self, key: ReturnKey) -> List[ItemReturn]:
+        return self.calc.get_item_condition_returns(key[0], key[1], self.time_range)
+
+    def read(self) -> Optional[CachedReturns]:
+        try:
+            with open(self.file_path, 'rb') as f:
+                cached = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError) as e:
+            print(f'[WARN] Ignoring broken returns cache {self.file_path}: {e}')
+            return None
+        if (not isinstance(cached, CachedReturns) or cached.version != returns_cache_version
+                or cached.signature != self.signature):
+            return None
+        return cached
+
+    def save(self, cached: CachedReturns):
+        tmp_file_path = f'{self.file_path}.tmp'
+        with open(tmp_file_path, 'wb') as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file_path, self.file_path)
+
+
+class ProfitabilityChanges(NamedTuple):
+    profitable: List[ItemReturn]
+    unprofitable: List[ItemReturn]
+
+
+def is_profitable(item_return: ItemReturn, min_roi: float = 0.05, min_revenue: float = 1) -> bool:
+    return item_return.item_roi > min_roi and item_return.item_revenue > min_revenue
+
+
+def get_return_id(item_return: ItemReturn) -> ReturnId:
+    return (item_return.item, item_return.item_condition, item_return.float_range,
+            item_return.item_float, item_return.item_id)
+
+
+def get_profitability_changes(previous: List[ItemReturn], current: List[ItemReturn],
+                              profitable: Callable[[ItemReturn], bool] = is_profitable) -> ProfitabilityChanges:
+    previous_profitable = {get_return_id(r): r for r in previous if profitable(r)}
+    current_profitable = {get_return_id(r): r for r in current if profitable(r)}
+    return ProfitabilityChanges(
+        [r for return_id, r in current_profitable.items() if return_id not in previous_profitable],
+        [r for return_id, r in previous_profitable.items() if return_id not in current_profitable])
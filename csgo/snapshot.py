@@ -0,0 +1,150 @@
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict
+
+import numpy as np
+import yaml
+
+from csgo.journal import get_price_journal
+from csgo.listing import ListingStore
+from csgo.type.price import ItemPrices, PriceDetails, PriceEntry
+
+
+class PriceSnapshot(ABC):
+    extension: str
+
+    @abstractmethod
+    def load_listings(self, file_path: str) -> ListingStore:
+        pass
+
+    @abstractmethod
+    def save_listings(self, listings: ListingStore, file_path: str):
+        pass
+
+    def load(self, file_path: str) -> ItemPrices:
+        return self.load_listings(file_path).to_item_prices()
+
+    def save(self, prices: ItemPrices, file_path: str):
+        self.save_listings(ListingStore.from_item_prices(prices), file_path)
+
+
+class YAMLPriceSnapshot(PriceSnapshot):
+    extension = '.yaml'
+
+    def load_listings(self, file_path: str) -> ListingStore:
+        return ListingStore.from_item_prices(self.load(file_path))
+
+    def save_listings(self, listings: ListingStore, file_path: str):
+        self.save(listings.to_item_prices(), file_path)
+
+    def load(self, file_path: str) -> ItemPrices:
+        return load_item_prices(file_path)
+
+    def save(self, prices: ItemPrices, file_path: str):
+        save_item_prices(prices, file_path)
+
+
+# unknown updated_at is stored as -1
+class NPZPriceSnapshot(PriceSnapshot):
+
+    extension = '.npz'
+
+    def load_listings(self, file_path: str) -> ListingStore:
+        with np.load(file_path, allow_pickle=False) as data:
+            names = data['names'].tolist()
+            offsets = data['offsets'].tolist()
+            return ListingStore(
+                {name: (offsets[i], offsets[i + 1]) for i, name in enumerate(names)},
+                {name: u if u >= 0 else None for name, u in zip(names, data['updated_at'].tolist())},
+                data['prices'], data['floats'], data['withdrawable_in'], data['item_ids'])
+
+    def save_listings(self, listings: ListingStore, file_path: str):
+        names = list(listings.index)
+        tmp_file_path = f'{file_path}.tmp'
+        with open(tmp_file_path, 'wb') as f:
+            np.savez(f,
+                     names=np.array(names, dtype=np.str_),
+                     offsets=np.array([0] + [listings.index[n][1] for n in names], dtype=np.int64),
+                     updated_at=np.array([listings.updated_at[n] if listings.updated_at[n] is not None else -1
+                                          for n in names], dtype=np.int64),
+                     prices=listings.prices, floats=listings.floats,
+                     withdrawable_in=listings.withdrawable_in, item_ids=listings.item_ids)
+        os.replace(tmp_file_path, file_path)
+
+
+price_snapshots: Dict[str, PriceSnapshot] = {s.extension: s for s in [YAMLPriceSnapshot(), NPZPriceSnapshot()]}
+
+
+def get_price_snapshot(file_path: str) -> PriceSnapshot:
+    extension = os.path.splitext(file_path)[1]
+    if extension not in price_snapshots:
+        raise AssertionError(f'Unknown price snapshot format {extension}, expected one of {list(price_snapshots)}')
+    return price_snapshots[extension]
+
+
+def load_price_listings(file_path: str) -> ListingStore:
+    migrate_legacy_snapshot(file_path)
+    if not get_price_journal(file_path).exists():
+        return get_price_snapshot(file_path).load_listings(file_path)
+    return ListingStore.from_item_prices(load_price_snapshot(file_path))
+
+
+def load_price_snapshot(file_path: str) -> ItemPrices:
+    # a refresh interrupted before its first compaction leaves only the journal
+    migrate_legacy_snapshot(file_path)
+    journal = get_price_journal(file_path)
+    prices = get_price_snapshot(file_path).load(file_path) if os.path.exists(file_path) or not journal.exists() else {}
+    return {**prices, **journal.replay()}
+
+
+def save_price_snapshot(prices: ItemPrices, file_path: str):
+    get_price_snapshot(file_path).save(prices, file_path)
+
+
+def convert_price_snapshot(source_file_path: str, target_file_path: str):
+    get_price_snapshot(target_file_path).save_listings(load_price_listings(source_file_path), target_file_path)
+
+
+def migrate_legacy_snapshot(file_path: str):
+    # checkouts from before the .npz snapshots only have the YAML ones, converted once on first load
+    legacy_file_path = os.path.splitext(file_path)[0] + YAMLPriceSnapshot.extension
+    if legacy_file_path != file_path and not os.path.exists(file_path) and os.path.exists(legacy_file_path):
+        print(f'Converting legacy price snapshot {legacy_file_path} to {file_path}')
+        convert_price_snapshot(legacy_file_path, file_path)
+
+
+def load_item_prices(file_path: str) -> ItemPrices:
+    with open(file_path) as f:
+        data = yaml.load(f, Loader=yaml.SafeLoader)
+
+        return {
+            item_name: PriceDetails([
+                PriceEntry(item_name, float(price_details['p']), float(price_details['f']),
+                           item_id=item_id, withdrawable_in=price_details.get('w'))
+                for item_id, price_details in item_details.get('prices', {}).items()
+                if price_details.get('p') and price_details.get('f')
+            ], item_details.get('u')) for item_name, item_details in data.get('items', {}).items()
+        }
+
+
+def save_item_prices(prices: ItemPrices, file_path: str):
+    tmp_file_path = f'{file_path}.tmp'
+    with open(tmp_file_path, 'w') as f:
+        yaml.dump({'items': {
+            item_name: {
+                'u': price_details.updated_at,
+                'prices': {
+                    p.item_id: {
+                        **{'f': p.float_value, 'p': p.price},
+                        **({'w': p.withdrawable_in} if p.withdrawable_in else {})
+                    } for p in price_details.prices}}
+            for item_name, price_details in prices.items()
+        }}, f, default_flow_style=False)
+    os.replace(tmp_file_path, file_path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        raise AssertionError('Usage: python -m csgo.snapshot <source file> <target file>')
+    convert_price_snapshot(sys.argv[1], sys.argv[2])
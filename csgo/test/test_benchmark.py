@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from csgo.benchmark.data import get_synthetic_collections, get_synthetic_listings, get_synthetic_sales
+from csgo.benchmark.suite import run_suite, get_regressions
+
+
+class BenchmarkTest(TestCase):
+
+    def test_synthetic_data_is_reproducible(self):
+        collections = get_synthetic_collections(5, seed=1)
+        self.assertEqual(get_synthetic_listings(collections, seed=1), get_synthetic_listings(collections, seed=1))
+        self.assertEqual(set(get_synthetic_sales(collections)), set(get_synthetic_listings(collections)))
+
+    def test_regressions(self):
+        results = run_suite('small', repeat=1, name_filter='listing.')
+        self.assertEqual(set(results['results']), {'listing.build_store', 'listing.float_range_search'})
+
+        slower = {**results, 'results': {name: {**result, 'min_seconds': result['min_seconds'] * 2}
+                                         for name, result in results['results'].items()}}
+        self.assertEqual(get_regressions(results, results), [])
+        self.assertEqual([r.name for r in get_regressions(results, slower)], ['listing.build_store',
+                                                                             'listing.float_range_search'])
+        with self.assertRaises(AssertionError):
+            get_regressions({**results, 'scale': 'large'}, results)
@@ -1,12 +1,16 @@
+from concurrent.futures.thread import ThreadPoolExecutor
+from itertools import combinations
+from typing import Set, Tuple, List
 from unittest import TestCase
 
-from csgo.contract import STItemReturnCalc
+from csgo.contract import STItemReturnCalc, GetContractReturnTask, ContractSearch, ContractCollector, \
+    get_top_contracts_exhaustive
 from csgo.price import STPriceManager
 from csgo.test.utils import get_avg_price_entry
-from csgo.type.contract import ItemReturn
+from csgo.type.contract import ItemReturn, ContractItem, ContractReturn
 from csgo.type.float import FloatRange
 from csgo.type.item import Item, ItemCollection, ItemCondition
-from csgo.type.price import PriceTimeRange, get_market_name
+from csgo.type.price import PriceTimeRange, get_market_name, PriceEntry
 
 
 class CalculateTest(TestCase):
@@ -96,3 +100,70 @@ class CalculateTest(TestCase):
                        output_items={'item4b-1 (Minimal Wear)': 500, 'item4b-2 (Field-Tested)': 200})]
 
         self.assertEqual(limited_float_return, expected)
+
+    def to_contract_items(self, item: Item, prices_and_floats) -> Set[ContractItem]:
+        return {ContractItem(item, PriceEntry(item.name, p, f)) for p, f in prices_and_floats}
+
+    def get_contract_search_items(self) -> Tuple[Set[ContractItem], Set[ContractItem]]:
+        items = (self.to_contract_items(self.ItemA3_1, [(40, 0.08), (45, 0.11), (70, 0.14)]) |
+                 self.to_contract_items(self.ItemA3_2, [(30, 0.09), (55, 0.12), (35, 0.145)]) |
+                 self.to_contract_items(self.ItemA3_3, [(60, 0.075), (20, 0.13)]) |
+                 self.to_contract_items(self.ItemB3_1, [(25, 0.071), (50, 0.1), (65, 0.105), (15, 0.149)]))
+        next_items = self.to_contract_items(self.ItemB3_1, [(5, 0.16), (8, 0.2)])
+        return items, next_items
+
+    def test_contract_search_matches_exhaustive(self):
+        items, next_items = self.get_contract_search_items()
+        task = GetContractReturnTask(next_items, self.collections, self.price_manager,
+                                     buy_reduction=1, sale_commission=0.1, strict=True)
+        expected = get_top_contracts_exhaustive(items, task)
+        search = ContractSearch(task)
+        contracts = search.search(items)
+
+        self.assertEqual(len(contracts), 1)
+        self.assertAlmostEqual(contracts[0].contract_revenue, expected[0].contract_revenue)
+        self.assertEqual(contracts[0].avg_float, expected[0].avg_float)
+        self.assertLess(search.evaluated, len(list(combinations(items, 10))))
+
+    def test_exhaustive_contracts_on_thread_pool(self):
+        items, next_items = self.get_contract_search_items()
+        task = GetContractReturnTask(next_items, self.collections, self.price_manager,
+                                     buy_reduction=1, sale_commission=0.1, strict=True)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            contracts = get_top_contracts_exhaustive(items, task, executor, top=3, chunk_size=1, max_pending=4)
+
+        self.assertEqual([(round(c.contract_revenue, 6), c.avg_float) for c in contracts],
+                         [(round(c.contract_revenue, 6), c.avg_float)
+                          for c in get_top_contracts_exhaustive(items, task, top=3)])
+
+    def test_contract_search_top_contracts(self):
+        items, next_items = self.get_contract_search_items()
+        task = GetContractReturnTask(next_items, self.collections, self.price_manager,
+                                     buy_reduction=1, sale_commission=0.1, strict=True)
+        expected = get_top_contracts_exhaustive(items, task, top=3)
+        contracts = ContractSearch(task, top=3).search(items)
+
+        self.assertEqual([(round(c.contract_revenue, 6), c.avg_float) for c in contracts],
+                         [(round(c.contract_revenue, 6), c.avg_float) for c in expected])
+
+    def test_contract_collector(self):
+        def to_contract_return(revenue: float, avg_float: float, prices: List[float] = None) -> ContractReturn:
+            source_items = [ContractItem(self.ItemA3_1, PriceEntry(self.ItemA3_1.name, p, avg_float))
+                            for p in prices or [revenue]]
+            return ContractReturn(source_items, [], 100, 100 + revenue, avg_float)
+
+        collector = ContractCollector(2)
+        collector.add_all([to_contract_return(10, 0.1), None, to_contract_return(30, 0.1),
+                           to_contract_return(20, 0.1), to_contract_return(30, 0.2)])
+
+        self.assertEqual([(c.contract_revenue, c.avg_float) for c in collector.get_contracts()],
+                         [(30, 0.2), (30, 0.1)])
+        self.assertEqual(collector.min_revenue, 30)
+
+        # the same source items in another order are the same contract
+        collector = ContractCollector(3)
+        collector.add_all([to_contract_return(30, 0.1, [1, 2]), to_contract_return(30, 0.1, [2, 1]),
+                           to_contract_return(20, 0.1), to_contract_return(10, 0.1),
+                           to_contract_return(20, 0.1), to_contract_return(25, 0.1)])
+
+        self.assertEqual([c.contract_revenue for c in collector.get_contracts()], [30, 25, 20])
@@ -1,8 +1,13 @@
+import os
+import tempfile
 from unittest import TestCase
 
+import yaml
+
 from csgo.conversion import get_conversion_required_ranges, get_condition_from_float, \
-    get_item_possible_conditions, get_item_condition_ranges, get_item_to_item_conversions
-from csgo.type.item import Item, ItemCondition
+    get_item_possible_conditions, get_item_condition_ranges, get_item_to_item_conversions, OutcomeIndex, \
+    ConversionMap, load_compiled_collections, get_compiled_collections_file, read_compiled_collections
+from csgo.type.item import Item, ItemCondition, ItemCollection, to_st_track
 from csgo.type.float import FloatRange
 
 
@@ -109,3 +114,81 @@ class ConversionTest(TestCase):
             ItemCondition.MINIMAL_WEAR: FloatRange(0, 0.07)
         }
         self.assertEqual(conversions, expected)
+
+    def test_outcome_index(self):
+        item = Item('test', 3, 'test')
+        target_item = Item('target_test', 4, 'test', min_float=0.1, max_float=0.6)
+        target_item_fn = Item('target_test_fn', 4, 'test', min_float=0, max_float=0.08)
+        index = OutcomeIndex({'test': ItemCollection('test', [item, target_item, target_item_fn])})
+
+        self.assertEqual(index.get_outcomes(item, 0.5),
+                         [(target_item, ItemCondition.FIELD_TESTED), (target_item_fn, ItemCondition.FACTORY_NEW)])
+        self.assertEqual(index.get_outcomes(item, 0.6),
+                         [(target_item, ItemCondition.WELL_WORN), (target_item_fn, ItemCondition.FACTORY_NEW)])
+        self.assertEqual(index.get_outcomes(item, 0.9),
+                         [(target_item, ItemCondition.BATTLE_SCARED), (target_item_fn, ItemCondition.MINIMAL_WEAR)])
+        self.assertEqual(index.get_outcomes(to_st_track(item), 0.7),
+                         [(to_st_track(target_item), None), (to_st_track(target_item_fn), ItemCondition.FACTORY_NEW)])
+        self.assertEqual(index.get_outcomes(target_item, 0.5), [])
+
+    def test_array_conversion_map(self):
+        collections = {
+            'test': ItemCollection('test', [
+                Item('item4-1', 4, 'test', min_float=0.1, max_float=0.6),
+                Item('item4-2', 4, 'test', min_float=0, max_float=0.08),
+                Item('item4-3', 4, 'test'),
+                Item('item3-1', 3, 'test'),
+                Item('item3-2', 3, 'test', min_float=0.06, max_float=0.8),
+                Item('item2-1', 2, 'test', min_float=0.2, max_float=0.5),
+                Item('item1-1', 1, 'test')
+            ]),
+            'other': ItemCollection('other', [
+                Item('item5-1', 5, 'other', min_float=0.02, max_float=0.87),
+                Item('item4-1', 4, 'other', min_float=0, max_float=0.5)
+            ])
+        }
+
+        self.assertEqual(ConversionMap.build_array_conversion_map(collections),
+                         ConversionMap.build_conversion_map(collections))
+
+    def test_st_track_rules_cache(self):
+        item = Item('item3-1', 3, 'test')
+        target_item = Item('item4-1', 4, 'test', min_float=0.1, max_float=0.6)
+        conversion_map = ConversionMap({'test': ItemCollection('test', [item, target_item], st_track=True)})
+
+        rules = conversion_map.get_rules(to_st_track(item))
+        self.assertEqual(rules, {
+            float_range: {to_st_track(i): c for i, c in conversion_items.items()}
+            for float_range, conversion_items in conversion_map.get_rules(item).items()
+        })
+        self.assertIs(conversion_map.get_rules(to_st_track(item)), rules)
+        self.assertEqual(conversion_map.get_rules(to_st_track(target_item)), {})
+        self.assertEqual(conversion_map.cache_info(), (1, 2, 2))
+
+    def test_load_compiled_collections(self):
+        data = {'collections': {'test': {'st_track': True, 'items': {
+            'item4-1': {'rarity': 4, 'min_float': 0.1, 'max_float': 0.6},
+            'item3-1': {'rarity': 3, 'min_float': 0, 'max_float': 1}
+        }}}}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'collections.yaml')
+            with open(file_path, 'w') as f:
+                yaml.dump(data, f)
+
+            collections, conversion_map = load_compiled_collections(file_path)
+            compiled = read_compiled_collections(get_compiled_collections_file(file_path))
+            item = Item('item3-1', 3, 'test')
+            self.assertEqual(compiled.collections, collections)
+            self.assertEqual(conversion_map.get_rules(item), ConversionMap(collections).get_rules(item))
+
+            cached_collections, _ = load_compiled_collections(file_path)
+            self.assertEqual(cached_collections, collections)
+
+            data['collections']['test']['items']['item4-1']['max_float'] = 0.8
+            with open(file_path, 'w') as f:
+                yaml.dump(data, f)
+            updated_collections, _ = load_compiled_collections(file_path)
+            self.assertEqual({i.name: i.max_float for i in updated_collections['test'].items},
+                             {'item4-1': 0.8, 'item3-1': 1})
+            self.assertNotEqual(read_compiled_collections(get_compiled_collections_file(file_path)).digest,
+                                compiled.digest)
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+from argparse import ArgumentParser
+from unittest import TestCase
+
+from csgo.instrument import Instrumentation, add_instrumentation_args, instrumented, instrumentation
+
+
+class InstrumentationTest(TestCase):
+
+    def test_timers_and_counters(self):
+        metrics = Instrumentation()
+
+        @metrics.timed('square')
+        def square(value: int) -> int:
+            metrics.count('squared')
+            return value * value
+
+        self.assertEqual([square(v) for v in range(3)], [0, 1, 4])
+        with metrics.timer('block'):
+            metrics.count('items', 10)
+
+        summary = metrics.get_summary()
+        self.assertEqual(summary['counters'], {'squared': 3, 'items': 10})
+        self.assertEqual({name: t['count'] for name, t in summary['timers'].items()}, {'square': 3, 'block': 1})
+        self.assertGreaterEqual(summary['elapsed_seconds'], summary['timers']['block']['total_seconds'])
+
+    def test_instrumented_run(self):
+        parser = ArgumentParser()
+        add_instrumentation_args(parser)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            metrics_file = os.path.join(tmp_dir, 'metrics.json')
+            profile_file = os.path.join(tmp_dir, 'run.prof')
+            args = parser.parse_args(['--metrics', metrics_file, '--profile', 'cprofile',
+                                      '--profile-output', profile_file])
+            with instrumented(args, 'test'):
+                with instrumentation.timer('load'):
+                    instrumentation.count('loaded', 2)
+
+            with open(metrics_file) as f:
+                summary = json.load(f)
+            self.assertEqual(set(summary['timers']), {'total', 'load'})
+            self.assertEqual(summary['counters'], {'loaded': 2})
+            self.assertTrue(os.path.getsize(profile_file))
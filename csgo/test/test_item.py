@@ -1,6 +1,8 @@
+import pickle
 from unittest import TestCase
 
-from csgo.type.item import ItemCondition
+from csgo.type.item import ItemCondition, Item, to_st_track, to_basic, get_item, ST_PREFIX
+from csgo.type.price import get_market_name
 
 
 class ItemTest(TestCase):
@@ -12,3 +14,24 @@ class ItemTest(TestCase):
     def test_item_cond_short_str(self):
         name = ItemCondition.to_short_str(ItemCondition.WELL_WORN)
         self.assertEqual(name, 'WW')
+
+    def test_item_interning(self):
+        item = Item('AK-47 | Redline', 3, 'test', min_float=0.1, max_float=0.7)
+
+        self.assertIs(Item('AK-47 | Redline', 3, 'test', 0.1, 0.7), item)
+        self.assertIsNot(Item('AK-47 | Redline', 3, 'test', 0.1, 0.8), item)
+        self.assertIs(to_basic(to_st_track(item)), item)
+        self.assertIs(pickle.loads(pickle.dumps(item)), item)
+        self.assertIs(get_item(item.id), item)
+        self.assertEqual(hash(item), item.id)
+        with self.assertRaises(AttributeError):
+            item.rarity = 4
+
+    def test_item_market_name(self):
+        item = to_st_track(Item('AK-47 | Redline', 3, 'test'))
+
+        self.assertEqual(item.full_name, f'{ST_PREFIX}AK-47 | Redline')
+        self.assertEqual(get_market_name(item, ItemCondition.FIELD_TESTED),
+                         f'{ST_PREFIX}AK-47 | Redline (Field-Tested)')
+        self.assertIs(item.get_market_name(ItemCondition.FIELD_TESTED),
+                      get_market_name(item, ItemCondition.FIELD_TESTED))
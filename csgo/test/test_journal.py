@@ -0,0 +1,91 @@
+import os
+import tempfile
+from typing import Dict
+from unittest import TestCase
+
+from csgo.interface.updater import Updater
+from csgo.journal import get_price_journal, get_sales_journal
+from csgo.price import load_item_sales
+from csgo.snapshot import save_price_snapshot, load_price_snapshot, load_price_listings
+from csgo.type.price import PriceDetails, PriceEntry, SaleEntry, ItemPrices
+
+
+def get_price_details(item_name: str, price: float, updated_at: int = 100) -> PriceDetails:
+    return PriceDetails([PriceEntry(item_name, price, 0.2, item_id=f'{item_name}-1', withdrawable_in=2)], updated_at)
+
+
+class JournalUpdater(Updater):
+    items: Dict[str, float] = {}
+    failing_item: str = None
+
+    def __init__(self, prices_file: str) -> None:
+        super().__init__({}, None, conversion_map=object())
+        self.prices_file = prices_file
+
+    def get_items_for_price_update(self, collections, conversion_map, price_manager, price_reference_delta):
+        return self.items
+
+    def request_prices(self, items: Dict[str, float]) -> ItemPrices:
+        if self.failing_item in items:
+            raise ConnectionError('interrupted')
+        return {item_name: get_price_details(item_name, price, 200) for item_name, price in items.items()}
+
+    get_item_name_from_url = get_item_prices_url = get_item_sales_url = get_prices_from_response = \
+        get_sale_price_from_response = add_next_page_request = get_page_number = None
+
+
+class JournalTest(TestCase):
+
+    def test_journal_replay(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            journal = get_price_journal(os.path.join(tmp_dir, 'prices.npz'))
+            journal.append({'a': get_price_details('a', 1), 'b': get_price_details('b', 2)})
+            journal.append({'a': get_price_details('a', 3)})
+            with open(journal.file_path, 'a') as f:
+                f.write('{"n": "c", "u": 1')
+
+            self.assertEqual(journal.replay(), {'a': get_price_details('a', 3), 'b': get_price_details('b', 2)})
+            journal.clear()
+            self.assertEqual(journal.replay(), {})
+
+    def test_load_prices_with_journal(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'prices.npz')
+            get_price_journal(file_path).append({'a': get_price_details('a', 1)})
+            self.assertEqual(load_price_snapshot(file_path), {'a': get_price_details('a', 1)})
+
+            save_price_snapshot({'a': get_price_details('a', 1), 'b': get_price_details('b', 2)}, file_path)
+            get_price_journal(file_path).append({'b': get_price_details('b', 5)})
+            self.assertEqual(load_price_snapshot(file_path),
+                             {'a': get_price_details('a', 1), 'b': get_price_details('b', 5)})
+            self.assertEqual(load_price_listings(file_path).get('b').prices.tolist(), [5])
+
+    def test_load_sales_with_journal(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'sales.yaml')
+            get_sales_journal(file_path).append({'a': SaleEntry('a', 1.5, 100)})
+            self.assertEqual(load_item_sales(file_path), {'a': SaleEntry('a', 1.5, 100)})
+
+            Updater.save_sales({'a': SaleEntry('a', 1, 50), 'b': SaleEntry('b', 2, 50)}, file_path)
+            self.assertEqual(load_item_sales(file_path), {'a': SaleEntry('a', 1.5, 100), 'b': SaleEntry('b', 2, 50)})
+
+    def test_update_prices_journal(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'prices.npz')
+            save_price_snapshot({'old': get_price_details('old', 1)}, file_path)
+            updater = JournalUpdater(file_path)
+            updater.items = {f'item{i}': i for i in range(150)}
+            updater.failing_item = 'item120'
+
+            with self.assertRaises(ConnectionError):
+                updater.update_prices()
+            self.assertTrue(get_price_journal(file_path).exists())
+            self.assertEqual(len(load_price_snapshot(file_path)), 101)
+
+            updater.failing_item = None
+            updater.items = {**updater.items, 'old': 7}
+            updater.update_prices()
+            self.assertFalse(get_price_journal(file_path).exists())
+            prices = load_price_snapshot(file_path)
+            self.assertEqual(len(prices), 151)
+            self.assertEqual(prices['item120'], get_price_details('item120', 120, 200))
@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+from csgo.contract import BSItemReturnCalc
+from csgo.conversion import ConversionMap
+from csgo.listing import ListingStore
+from csgo.price import BSPriceManager
+from csgo.type.item import Item, ItemCollection, ItemCondition
+from csgo.type.price import PriceDetails, PriceEntry, SaleEntry, get_market_name
+
+
+class ListingTest(TestCase):
+    item = Item('item3-1', 3, 'test')
+    target_item = Item('item4-1', 4, 'test')
+    market_name = get_market_name(item, ItemCondition.FIELD_TESTED)
+    item_prices = {
+        market_name: PriceDetails([
+            PriceEntry(market_name, 1.5, 0.2, item_id='1'),
+            PriceEntry(market_name, 1.2, 0.16, item_id='2', withdrawable_in=3),
+            PriceEntry(market_name, 1.1, 0, item_id='3'),
+            PriceEntry(market_name, 1.3, 0.35)
+        ], 100),
+        'empty': PriceDetails([], 200)
+    }
+
+    def test_listing_store(self):
+        store = ListingStore.from_item_prices(self.item_prices)
+        listings = store.get(self.market_name)
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(len(listings), 4)
+        self.assertEqual(len(store.get('empty')), 0)
+        self.assertEqual(len(store.get('missing')), 0)
+        self.assertIs(listings.prices.base, store.prices)
+        self.assertEqual(listings.floats.tolist(), [0, 0.16, 0.2, 0.35])
+        self.assertEqual(store.to_item_prices(), {
+            market_name: PriceDetails(sorted(price_details.prices, key=lambda p: p.float_value),
+                                      price_details.updated_at)
+            for market_name, price_details in self.item_prices.items()
+        })
+
+    def test_listings_in_float_range(self):
+        listings = ListingStore.from_item_prices(self.item_prices).get(self.market_name)
+
+        self.assertEqual([p.item_id for p in listings.in_float_range(0.15, 0.3)], ['2', '1'])
+        self.assertEqual([p.item_id for p in listings.in_float_range(0, 0.2)], ['2'])
+        self.assertEqual([p.item_id for p in listings.in_float_range(0.3, 0.2)], [])
+        self.assertEqual([p.item_id for p in listings.in_float_range(0, 0.16)], [])
+        self.assertEqual(list(listings.in_float_range(0.3, 1)), [PriceEntry(self.market_name, 1.3, 0.35)])
+
+    def test_items_on_sale_in_range(self):
+        price_manager = BSPriceManager()
+        price_manager.listings = ListingStore.from_item_prices(self.item_prices)
+        items_on_sale = price_manager.get_items_on_sale_in_range(self.item, ItemCondition.FIELD_TESTED, 0, 1)
+
+        self.assertEqual(items_on_sale.prices.tolist(), [1.2, 1.3, 1.5])
+        self.assertEqual(len(price_manager.get_items_on_sale_in_range(self.item, ItemCondition.MINIMAL_WEAR, 0, 1)), 0)
+
+    def test_bs_item_returns(self):
+        collections = {'test': ItemCollection('test', [self.item, self.target_item])}
+        price_manager = BSPriceManager()
+        price_manager.listings = ListingStore.from_item_prices(self.item_prices)
+        price_manager.sales = {
+            get_market_name(self.target_item, cond): SaleEntry(get_market_name(self.target_item, cond), 20, 0)
+            for cond in ItemCondition
+        }
+        returns = BSItemReturnCalc(ConversionMap(collections), price_manager).get_item_returns(self.item)
+
+        self.assertEqual(sorted((r.item_float, r.item_investment, r.item_id) for r in returns),
+                         [(0.16, 12, '2'), (0.2, 15, '1'), (0.35, 13, None)])
+        self.assertTrue(all(r.item_return == 18 for r in returns))
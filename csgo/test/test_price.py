@@ -1,9 +1,13 @@
+import json
+import os
+import tempfile
 from unittest import TestCase
 
-from csgo.price import STPriceManager
+from csgo.price import STPriceManager, load_bck_prices, to_lf_price_entries
 from csgo.test.utils import get_avg_price_entry
 from csgo.type.item import Item, ItemCollection, ItemCondition, ItemRarity
-from csgo.type.price import PriceTimeRange, get_market_name
+from csgo.type.price import PriceTimeRange, get_market_name, STItemPrice, STItemPriceDetails, PriceEntry, \
+    PriceDetails
 
 
 class CalculateTest(TestCase):
@@ -207,3 +211,107 @@ class CalculateTest(TestCase):
 
         self.assertEqual(price_manager.get_approx_price_from_rarity(
             Item('item4-1', 4, 'test'), ItemCondition.FIELD_TESTED, self.time_range), 90 / (40 / 60))
+
+    def test_approximations_invalidated_on_update(self):
+        prices = {
+            get_market_name(name, cond): get_avg_price_entry(self.time_range, (index + 1) * (cond + 1) * 10)
+            for index, name in enumerate(['item5', 'item4-1', 'item4-2', 'item3-1', 'item3-2'])
+            for cond in [ItemCondition.BATTLE_SCARED, ItemCondition.WELL_WORN, ItemCondition.FIELD_TESTED,
+                         ItemCondition.FACTORY_NEW]
+        }
+        update = {get_market_name('item4-1', ItemCondition.FIELD_TESTED): get_avg_price_entry(self.time_range, 7),
+                  get_market_name('item5', ItemCondition.MINIMAL_WEAR): get_avg_price_entry(self.time_range, 400)}
+        items = self.collections['test'].items
+
+        def get_approximations(price_manager: STPriceManager):
+            return [(price_manager.get_approx_price(item, cond, self.time_range),
+                     price_manager.get_approx_price_from_rarity(item, cond, self.time_range))
+                    for item in items if item.rarity > 2 for cond in ItemCondition]
+
+        price_manager = STPriceManager(prices, self.collections)
+        before = get_approximations(price_manager)
+        price_manager.update_prices(update)
+        updated = get_approximations(price_manager)
+
+        expected_manager = STPriceManager({**prices, **update}, self.collections)
+        self.assertEqual(updated, get_approximations(expected_manager))
+        self.assertNotEqual(updated, before)
+        self.assertNotIn(get_market_name('item5', ItemCondition.MINIMAL_WEAR), prices)
+
+    def test_price_matrix_falls_back_to_longer_time_ranges(self):
+        prices = {
+            get_market_name('item5', ItemCondition.WELL_WORN): STItemPrice('', {
+                PriceTimeRange.HOURS_24: STItemPriceDetails(0, 0),
+                PriceTimeRange.DAYS_90: STItemPriceDetails(90, 3),
+                PriceTimeRange.ALL_TIME: STItemPriceDetails(50, 10)}),
+            get_market_name('item4-1', ItemCondition.FACTORY_NEW): get_avg_price_entry(self.time_range, 100)
+        }
+        price_manager = STPriceManager(prices, self.collections)
+        self.assertNotIn('condition_increase_ratios', price_manager.__dict__)
+
+        self.assertEqual(price_manager.get_avg_price(self.collections['test'].items[0], ItemCondition.WELL_WORN,
+                                                     PriceTimeRange.DAYS_7), 90)
+        self.assert_price_matrix_lookups(price_manager)
+
+        price_manager.update_prices({
+            get_market_name('item5', ItemCondition.WELL_WORN): get_avg_price_entry(PriceTimeRange.DAYS_7, 20)})
+        self.assertEqual(price_manager.get_avg_price(self.collections['test'].items[0], ItemCondition.WELL_WORN,
+                                                     PriceTimeRange.HOURS_24), 20)
+        self.assertIsNone(price_manager.get_avg_price(self.collections['test'].items[0], ItemCondition.WELL_WORN,
+                                                      PriceTimeRange.DAYS_30))
+        self.assert_price_matrix_lookups(price_manager)
+
+        # interned after the matrix was built
+        item = Item('item5-new', 5, 'test')
+        price_manager.update_prices({get_market_name(item, ItemCondition.WELL_WORN): get_avg_price_entry(
+            self.time_range, 30)})
+        self.assertEqual(price_manager.get_avg_price(item, ItemCondition.WELL_WORN, PriceTimeRange.DAYS_7), 30)
+        self.assertIsNone(price_manager.get_avg_price(item, ItemCondition.WELL_WORN, PriceTimeRange.DAYS_7, False))
+
+    def assert_price_matrix_lookups(self, price_manager: STPriceManager):
+        for item in self.collections['test'].items:
+            for cond in ItemCondition:
+                for t_range in PriceTimeRange:
+                    for with_price_fallback in [True, False]:
+                        self.assertEqual(
+                            price_manager.get_entry_avg_price(item, cond, t_range, with_price_fallback),
+                            price_manager.get_avg_price(item, cond, t_range, with_price_fallback))
+
+    def test_load_bck_prices_of_collection_items(self):
+        price_manager = STPriceManager({}, {'test': ItemCollection('test', [Item("Item's Skin", 3, 'test')])})
+        market_name = get_market_name("Item's Skin", ItemCondition.FIELD_TESTED)
+        price = {'average': 10.5, 'sold': 3, 'median': 10, 'standard_deviation': '1.5'}
+        dump = {'success': True, 'items_list': {
+            market_name.replace("'", '&#39;'): {'price': {'30_days': price, 'unknown': price}},
+            'Sticker | Other': {'price': {'30_days': price}}
+        }}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'bck_prices.json')
+            with open(file_path, 'w') as f:
+                json.dump(dump, f)
+
+            prices = load_bck_prices(price_manager.market_name_items.keys(), file_path)
+            self.assertEqual({market_name: STItemPrice(market_name, {
+                PriceTimeRange.DAYS_30: STItemPriceDetails(10.5, 3, 10, 1.5)})}, prices)
+            self.assertEqual(2, len(load_bck_prices(None, file_path)))
+
+            with open(file_path, 'w') as f:
+                json.dump({**dump, 'success': False}, f)
+            with self.assertRaises(AssertionError):
+                load_bck_prices(None, file_path)
+
+    def test_to_lf_price_entries_in_listing_order(self):
+        data = {'1': {'n': 'Item', 'e': 'FT', 'p': 1000, 'pst': 2000, 't': {'r': 'wr'}, 'u': {
+            'bot1': [{'f': '20000:1', 'st': 0}, {'f': 0.3, 'st': 1, 'td': 24}],
+            'bot2': [{'f': 0.25, 'st': 0}]
+        }}}
+        market_name = get_market_name('Item', ItemCondition.FIELD_TESTED)
+
+        self.assertEqual({
+            market_name: PriceDetails([
+                PriceEntry(market_name, 10, 0.2, ItemRarity.MIL_SPEC_GRADE, item_name='Item'),
+                PriceEntry(market_name, 10, 0.25, ItemRarity.MIL_SPEC_GRADE, item_name='Item')], 100),
+            f'StatTrak™ {market_name}': PriceDetails([
+                PriceEntry(f'StatTrak™ {market_name}', 20, 0.3, ItemRarity.MIL_SPEC_GRADE, item_name='Item',
+                           withdrawable_in=24)], 100)
+        }, to_lf_price_entries(data, 100))
@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from csgo.contract import STItemReturnCalc
+from csgo.price import STPriceManager
+from csgo.returns import ReturnDependencies, IncrementalReturns, get_profitability_changes
+from csgo.type.contract import ItemReturn
+from csgo.type.float import FloatRange
+from csgo.test import test_contract_return
+from csgo.test.utils import get_avg_price_entry
+from csgo.type.item import ItemCondition
+from csgo.type.price import get_market_name
+
+
+class IncrementalReturnsTest(TestCase):
+    # a module level alias would collect the contract tests again
+    contract = test_contract_return.CalculateTest
+    collections = contract.collections
+    time_range = contract.time_range
+    items = [contract.ItemA3_1, contract.ItemA3_2, contract.ItemA4_1, contract.ItemB3_1]
+
+    def evaluate(self, prices, file_path: str, signature: str = 'test'):
+        price_manager = STPriceManager(prices, self.collections)
+        calc = STItemReturnCalc(self.collections, price_manager, possible_price_discount=0)
+        evaluation = IncrementalReturns(calc, ReturnDependencies.from_collections(self.items, self.collections),
+                                        price_manager, self.time_range, file_path, signature).evaluate()
+        expected = [r for item in self.items for r in calc.get_item_returns(item, self.time_range)]
+        self.assertCountEqual(evaluation.returns, expected)
+        return evaluation
+
+    def test_dependencies(self):
+        dependencies = ReturnDependencies.from_collections(self.items, self.collections)
+        self.assertEqual(dependencies.dependencies[(self.contract.ItemB3_1, ItemCondition.BATTLE_SCARED)], {
+            get_market_name('item3b-1', ItemCondition.BATTLE_SCARED),
+            get_market_name('item4b-1', ItemCondition.BATTLE_SCARED),
+            get_market_name('item4b-2', ItemCondition.FIELD_TESTED),
+            get_market_name('item4b-2', ItemCondition.WELL_WORN),
+            get_market_name('item4b-2', ItemCondition.BATTLE_SCARED)})
+        self.assertEqual(dependencies.get_affected([get_market_name('item4b-2', ItemCondition.MINIMAL_WEAR)]),
+                         {(self.contract.ItemB3_1, ItemCondition.FACTORY_NEW),
+                          (self.contract.ItemB3_1, ItemCondition.MINIMAL_WEAR)})
+        self.assertEqual(dependencies.get_affected(['unknown']), set())
+
+    def test_evaluate_recomputes_changed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'returns.pickle')
+            total = len(ReturnDependencies.from_collections(self.items, self.collections))
+
+            evaluation = self.evaluate(self.contract.prices, file_path)
+            self.assertEqual(evaluation.recomputed, total)
+
+            evaluation = self.evaluate(self.contract.prices, file_path)
+            self.assertEqual((evaluation.recomputed, evaluation.changed_market_names), (0, set()))
+
+            changed_name = get_market_name('item4b-2', ItemCondition.FIELD_TESTED)
+            evaluation = self.evaluate({**self.contract.prices,
+                                        changed_name: get_avg_price_entry(self.time_range, 250)}, file_path)
+            self.assertEqual(evaluation.changed_market_names, {changed_name})
+            self.assertEqual(evaluation.recomputed, 4)
+
+            evaluation = self.evaluate(self.contract.prices, file_path, signature='other')
+            self.assertEqual(evaluation.recomputed, total)
+
+    def test_calc_signature(self):
+        price_manager = STPriceManager({}, self.collections)
+
+        self.assertEqual(STItemReturnCalc(self.collections, price_manager, 10).get_signature(),
+                         STItemReturnCalc(self.collections, price_manager, 10).get_signature())
+        self.assertNotEqual(STItemReturnCalc(self.collections, price_manager, 10).get_signature(),
+                            STItemReturnCalc(self.collections, price_manager, 10, 0.1).get_signature())
+        self.assertNotEqual(
+            STItemReturnCalc(self.collections, price_manager).get_signature(),
+            STItemReturnCalc(self.collections, price_manager, with_price_fallback=False).get_signature())
+
+    def test_profitability_changes(self):
+        def to_item_return(item_return: float, item_float: float) -> ItemReturn:
+            return ItemReturn(self.contract.ItemA3_1, ItemCondition.FIELD_TESTED, 100, item_return,
+                              FloatRange(0.15, 0.38), item_float=item_float, output_items={})
+
+        changes = get_profitability_changes(
+            [to_item_return(120, 0.2), to_item_return(120, 0.3), to_item_return(90, 0.35)],
+            [to_item_return(130, 0.2), to_item_return(100, 0.3), to_item_return(110, 0.35)])
+        self.assertEqual(changes.profitable, [to_item_return(110, 0.35)])
+        self.assertEqual(changes.unprofitable, [to_item_return(120, 0.3)])
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from typing import Dict, Tuple, Set
+from unittest import TestCase
+
+from csgo.snapshot import load_price_snapshot, save_price_snapshot, convert_price_snapshot, load_price_listings, \
+    get_price_snapshot
+from csgo.type.price import PriceDetails, PriceEntry, ItemPrices
+
+
+def to_listing_sets(prices: ItemPrices) -> Dict[str, Tuple[Set[PriceEntry], int]]:
+    return {item_name: (set(price_details.prices), price_details.updated_at)
+            for item_name, price_details in prices.items()}
+
+
+class SnapshotTest(TestCase):
+    prices = {
+        'item (Field-Tested)': PriceDetails([
+            PriceEntry('item (Field-Tested)', 1.2, 0.16, item_id='2', withdrawable_in=3),
+            PriceEntry('item (Field-Tested)', 1.5, 0.2, item_id='1')
+        ], 100),
+        'item (Minimal Wear)': PriceDetails([PriceEntry('item (Minimal Wear)', 3.5, 0.1, item_id='3')], None),
+        'empty': PriceDetails([], 200)
+    }
+
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for extension in ['.yaml', '.npz']:
+                file_path = os.path.join(tmp_dir, f'prices{extension}')
+                save_price_snapshot(self.prices, file_path)
+
+                self.assertEqual(to_listing_sets(load_price_snapshot(file_path)), to_listing_sets(self.prices))
+                self.assertEqual(load_price_listings(file_path).get('item (Field-Tested)').prices.tolist(), [1.2, 1.5])
+
+    def test_convert_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            yaml_file_path = os.path.join(tmp_dir, 'prices.yaml')
+            npz_file_path = os.path.join(tmp_dir, 'prices.npz')
+            exported_file_path = os.path.join(tmp_dir, 'exported.yaml')
+            save_price_snapshot(self.prices, yaml_file_path)
+
+            convert_price_snapshot(yaml_file_path, npz_file_path)
+            convert_price_snapshot(npz_file_path, exported_file_path)
+            self.assertEqual(to_listing_sets(load_price_snapshot(npz_file_path)), to_listing_sets(self.prices))
+            self.assertEqual(to_listing_sets(load_price_snapshot(exported_file_path)), to_listing_sets(self.prices))
+
+    def test_load_legacy_yaml_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_price_snapshot(self.prices, os.path.join(tmp_dir, 'prices.yaml'))
+            npz_file_path = os.path.join(tmp_dir, 'prices.npz')
+
+            self.assertEqual(to_listing_sets(load_price_listings(npz_file_path).to_item_prices()),
+                             to_listing_sets(self.prices))
+            self.assertTrue(os.path.exists(npz_file_path))
+            self.assertEqual(to_listing_sets(load_price_snapshot(npz_file_path)), to_listing_sets(self.prices))
+
+    def test_unknown_snapshot_format(self):
+        with self.assertRaises(AssertionError):
+            get_price_snapshot('prices.json')
@@ -1,6 +1,130 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Optional
 from unittest import TestCase
+from urllib.parse import urlparse, parse_qs
 
+from requests import Response
+
+from csgo.interface.cache import ResponseCache, get_cache_key
+from csgo.interface.fetch import FetchEngine
+from csgo.interface.schedule import RefreshScheduler
+from csgo.interface.ratelimit import TokenBucket, RateLimit, get_retry_after
 from csgo.interface.updater import Updater
+from csgo.type.price import PriceEntry, PriceDetails
+
+StubListings = {
+    'a': [{'id': 'a1', 'p': 1, 'f': 0.1}, {'id': 'a2', 'p': 2, 'f': 0.2}, {'id': 'a3', 'p': 3, 'f': 0.3}],
+    'b': [{'id': 'b1', 'p': 4, 'f': 0.4}],
+    'c': []
+}
+
+
+class StubMarketHandler(BaseHTTPRequestHandler):
+    failed = set()
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(0.02)
+        query = parse_qs(urlparse(self.path).query)
+        name, page = query['name'][0], int(query['page'][-1])
+        with cls.lock:
+            cls.in_flight -= 1
+            fail = name in ('b', 'c') and name not in cls.failed
+            cls.failed.add(name)
+
+        items = StubListings[name][2 * (page - 1):2 * page]
+        status, body = ({'b': 500, 'c': 429}[name], {}) if fail else (200, {'page': page, 'items': items})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class StubSalesHandler(BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = json.dumps({'sales': [1.5, 2.5]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubFailingSalesHandler(StubSalesHandler):
+    requests = 0
+
+    def do_GET(self):
+        if type(self).requests:
+            return super().do_GET()
+        type(self).requests += 1
+        body = json.dumps({'status': 'error'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubUpdater(Updater):
+    max_concurrent_requests = 2
+
+    def __init__(self, url: str) -> None:
+        super().__init__({}, None, conversion_map=object(), price_page_size=2)
+        self.url = url
+
+    def get_item_prices_url(self, market_name: str, ref_price: float, per_page: int) -> str:
+        return f'{self.url}/prices?name={market_name}&page=1'
+
+    def get_item_sales_url(self, market_name: str) -> str:
+        return f'{self.url}/sales?name={market_name}'
+
+    @classmethod
+    def get_item_name_from_url(cls, url: str) -> str:
+        return parse_qs(urlparse(url).query)['name'][0]
+
+    @classmethod
+    def get_prices_from_response(cls, res: Response) -> List[PriceEntry]:
+        name = cls.get_item_name_from_url(res.request.url)
+        return [PriceEntry(name, i['p'], i['f'], item_id=i['id']) for i in res.json()['items']]
+
+    @classmethod
+    def get_sale_price_from_response(cls, res: Response) -> Optional[float]:
+        return res.json()['sales'][0]
+
+    @classmethod
+    def get_page_number(cls, res: Response, per_page: int) -> int:
+        return res.json()['page']
+
+    @classmethod
+    def add_next_page_request(cls, res: Response, requests_queue, next_page: int, auth):
+        requests_queue.append({'method': 'GET', 'url': res.request.url + f'&page={next_page}', 'auth': auth})
 
 
 class UpdaterTest(TestCase):
@@ -12,3 +136,138 @@ class UpdaterTest(TestCase):
     def test_get_file_name_with_special(self):
         name = Updater.get_file_name("DM-53 | come'get'it")
         self.assertEqual(name, "dm_53_come_get_it.json")
+
+    def test_request_prices(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubMarketHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            updater = StubUpdater(f'http://127.0.0.1:{server.server_port}')
+            prices = updater.request_prices({'a': None, 'b': None, 'c': None})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual({name: [p.item_id for p in details.prices] for name, details in prices.items()},
+                         {'a': ['a1', 'a2', 'a3'], 'b': ['b1'], 'c': []})
+        self.assertLessEqual(StubMarketHandler.max_in_flight, StubUpdater.max_concurrent_requests)
+        metrics = updater.fetch_engine.rate_limiter.get_metrics()[f'127.0.0.1:{server.server_port}']
+        self.assertEqual((metrics.requests_sent, metrics.rate_limited), (6, 1))
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(RateLimit(10, burst=2, min_rate=1, max_rate=11, increase=0.5))
+        delays = [bucket.reserve() for _ in range(4)]
+
+        self.assertEqual(delays[0:2], [0, 0])
+        self.assertAlmostEqual(delays[2], 0.1, delta=0.01)
+        self.assertAlmostEqual(delays[3], 0.2, delta=0.01)
+
+        bucket.on_success()
+        bucket.on_success()
+        self.assertEqual(bucket.rate, 11)
+        bucket.on_rate_limited(retry_after=5)
+        self.assertEqual(bucket.rate, 5.5)
+        self.assertAlmostEqual(bucket.reserve(), 5, delta=0.01)
+        self.assertEqual(bucket.get_metrics().rate_limited, 1)
+
+    def test_get_retry_after(self):
+        res = Response()
+        self.assertIsNone(get_retry_after(res))
+        res.headers['Retry-After'] = '3'
+        self.assertEqual(get_retry_after(res), 3)
+        res.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        self.assertEqual(get_retry_after(res), 0)
+
+    def test_request_sales_from_cache(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubSalesHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                updater = StubUpdater(f'http://127.0.0.1:{server.server_port}')
+                updater.http_cache_file = os.path.join(tmp_dir, 'cache.sqlite')
+                self.assertIsNone(updater.fetch_engine.cache)
+
+                sales = updater.request_sales({'a'}, 60)
+                time.sleep(1.1)
+                cached_sales = updater.request_sales({'a'}, 60)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(updater.fetch_engine.cache.stats.hits, 1)
+        # replayed sales keep the time they were fetched at
+        self.assertEqual(cached_sales, sales)
+        self.assertEqual(sales['a'].price, 1.5)
+
+    def test_response_cache_skips_rejected_responses(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubFailingSalesHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/sales?name=a'
+        responses = []
+
+        def handle(res: Response, queue: List[dict]):
+            Updater.check_request(res, queue, None)
+            responses.append(res)
+
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                cache = ResponseCache(os.path.join(tmp_dir, 'cache.sqlite'))
+                engine = FetchEngine(2, cache=cache)
+                with self.assertRaises(AssertionError):
+                    engine.run([{'method': 'GET', 'url': url, 'ttl': 60}], handle)
+                self.assertIsNone(cache.get(url))
+
+                engine.run([{'method': 'GET', 'url': url, 'ttl': 60}], handle)
+                engine.run([{'method': 'GET', 'url': url, 'ttl': 60}], handle)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual([r.json() for r in responses], [{'sales': [1.5, 2.5]}] * 2)
+        self.assertEqual(StubFailingSalesHandler.requests, 2)
+        self.assertEqual(cache.stats.hits, 1)
+
+    def test_refresh_scheduler(self):
+        now = 1000000
+        scheduler = RefreshScheduler(horizon_hours=24)
+        item_prices = {
+            # free listings are ignored
+            'profitable': PriceDetails([PriceEntry('profitable', 5, 0.1), PriceEntry('profitable', 6, 0.2),
+                                        PriceEntry('profitable', 0, 0.3)], now - 3600),
+            'volatile': PriceDetails([PriceEntry('volatile', 5, 0.1), PriceEntry('volatile', 20, 0.2)], now - 3600),
+            'stale': PriceDetails([PriceEntry('stale', 5, 0.1), PriceEntry('stale', 6, 0.2)], now - 48 * 3600),
+            'unprofitable': PriceDetails([PriceEntry('unprofitable', 5, 0.1)], now - 48 * 3600)
+        }
+        items = {'profitable': 10, 'volatile': 4, 'stale': 4, 'unprofitable': None, 'new': 3}
+        priorities = scheduler.rank(items, item_prices, now)
+
+        self.assertEqual([p.market_name for p in priorities],
+                         ['new', 'profitable', 'stale', 'unprofitable', 'volatile'])
+        self.assertEqual(priorities[0].staleness_hours, math.inf)
+        self.assertEqual(priorities[1].roi, 1)
+        self.assertGreater(priorities[-1].volatility, priorities[2].volatility)
+
+    def test_response_cache(self):
+        StubSalesHandler.requests = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubSalesHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/sales?name=a'
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                cache = ResponseCache(os.path.join(tmp_dir, 'cache.sqlite'))
+                engine = FetchEngine(2, cache=cache)
+                responses = []
+                for ttl in [0, 0, 60]:
+                    engine.run([{'method': 'GET', 'url': url + '&api_key=secret', 'ttl': ttl}],
+                               lambda res, queue: responses.append(res))
+                # requests without a ttl do not use the cache
+                engine.run([{'method': 'GET', 'url': url + '&page=2'}], lambda res, queue: None)
+                self.assertIsNone(cache.get(url + '&page=2'))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual([(r.status_code, r.json()) for r in responses], [(200, {'sales': [1.5, 2.5]})] * 3)
+        self.assertEqual(StubSalesHandler.requests, 3)
+        self.assertEqual((cache.stats.misses, cache.stats.revalidated, cache.stats.hits), (1, 1, 1))
+        self.assertEqual(cache.stats.bytes_saved, 2 * len(responses[0].content))
+        self.assertEqual(get_cache_key(url + '&api_key=secret&code=123'), url)
@@ -0,0 +1,49 @@
+import io
+import json
+from unittest import TestCase
+
+from csgo.util import JSONObjectStream
+
+
+class JSONObjectStreamTest(TestCase):
+    data = {
+        'success': True,
+        'skipped': {'prices': {'Other': {'avg': 1}}},
+        'result': {
+            'count': 3,
+            'prices': {
+                'AK-47 | Redline (Field-Tested)': {'avg': 12.5, 'sales': 1200, 'tags': ['a', 'b']},
+                'Sticker | \\"Quoted\\" ★': {'avg': 1e-3, 'sales': None},
+                'AWP | Asiimov (Battle-Scarred)': {'avg': 123456789, 'sales': 0}
+            }
+        },
+        'timestamp': 1600000000
+    }
+
+    def test_stream_object_members(self):
+        text = json.dumps(self.data, indent=2)
+        for chunk_size in [1, 3, 16, 1 << 16]:
+            stream = JSONObjectStream(io.StringIO(text), ['result', 'prices'], chunk_size)
+
+            self.assertEqual(list(self.data['result']['prices'].items()), list(stream))
+            self.assertEqual({'success': True, 'skipped': self.data['skipped'], 'timestamp': 1600000000},
+                             stream.values)
+
+    def test_stream_scalar_members_cut_by_chunks(self):
+        members = {'a': 123.45, 'b': 1e-3, 'c': -12, 'd': 'text', 'e': True, 'f': None, 'g': 6.02E+23}
+        text = json.dumps({'p': members, 'n': 2.5e10})
+        for chunk_size in [1, 2, 3, 4, 8]:
+            stream = JSONObjectStream(io.StringIO(text), ['p'], chunk_size)
+
+            self.assertEqual(members, dict(stream))
+            self.assertEqual({'n': 2.5e10}, stream.values)
+
+    def test_stream_empty_and_missing_objects(self):
+        self.assertEqual([], list(JSONObjectStream(io.StringIO('{"result": {"prices": {}}}'), ['result', 'prices'])))
+        self.assertEqual([], list(JSONObjectStream(io.StringIO('{"result": {}}'), ['result', 'prices'])))
+
+    def test_stream_broken_file(self):
+        with self.assertRaises(ValueError):
+            list(JSONObjectStream(io.StringIO('{"result": {"prices": {"a": 1'), ['result', 'prices'], 4))
+        with self.assertRaises(ValueError):
+            list(JSONObjectStream(io.StringIO('["result"]'), ['result']))
@@ -1,23 +1,66 @@
 import base64
-from typing import NamedTuple, List, Tuple
+from threading import Lock
+from typing import NamedTuple, List, Tuple, Dict
 
 from enum import IntEnum
 
 ST_PREFIX = base64.b64decode('U3RhdFRyYWvihKIg'.encode()).decode()
 
 
-class Item(NamedTuple):
-    name: str
-    rarity: int
-    collection_name: str
-    min_float: float = 0
-    max_float: float = 1
-    st_track: bool = False
-
-    @property
-    def full_name(self) -> str:
-        st_track = ST_PREFIX if self.st_track else ''
-        return f'{st_track}{self.name}'
+# interned: equal fields resolve to the same instance, hashing uses the registry id
+class Item:
+    __slots__ = ('id', 'name', 'rarity', 'collection_name', 'min_float', 'max_float', 'st_track', 'full_name',
+                 '_market_names')
+
+    def __new__(cls, name: str, rarity: int, collection_name: str,
+                min_float: float = 0, max_float: float = 1, st_track: bool = False) -> 'Item':
+        key = (name, rarity, collection_name, min_float, max_float, bool(st_track))
+        item = item_registry.get(key)
+        if item is None:
+            with item_registry_lock:
+                item = item_registry.get(key)
+                if item is None:
+                    item = object.__new__(cls)
+                    for attr, value in zip(cls.__slots__, (len(items_by_id), *key)):
+                        object.__setattr__(item, attr, value)
+                    object.__setattr__(item, 'full_name', f'{ST_PREFIX if st_track else ""}{name}')
+                    object.__setattr__(item, '_market_names', [None] * len(ItemCondition))
+                    items_by_id.append(item)
+                    item_registry[key] = item
+        return item
+
+    def __hash__(self) -> int:
+        return self.id
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f'Item is immutable, cannot set {key}')
+
+    def __delattr__(self, key):
+        raise AttributeError(f'Item is immutable, cannot delete {key}')
+
+    def __reduce__(self):
+        return Item, (self.name, self.rarity, self.collection_name, self.min_float, self.max_float, self.st_track)
+
+    def __repr__(self) -> str:
+        return (f'Item(name={self.name!r}, rarity={self.rarity!r}, collection_name={self.collection_name!r}, '
+                f'min_float={self.min_float!r}, max_float={self.max_float!r}, st_track={self.st_track!r})')
+
+    def get_market_name(self, item_condition: 'ItemCondition') -> str:
+        market_name = self._market_names[item_condition]
+        if market_name is None:
+            market_name = self._market_names[item_condition] = f'{self.full_name} ({str(item_condition)})'
+        return market_name
+
+
+ItemKey = Tuple[str, int, str, float, float, bool]
+
+item_registry: Dict[ItemKey, Item] = {}
+items_by_id: List[Item] = []
+item_registry_lock = Lock()
+
+
+def get_item(item_id: int) -> Item:
+    return items_by_id[item_id]
 
 
 def to_st_track(item: Item) -> Item:
@@ -1,4 +1,4 @@
-from typing import NamedTuple, Dict, Optional, Union, List
+from typing import NamedTuple, Dict, Optional, Union, List, Iterable
 
 from enum import IntEnum
 
@@ -45,6 +45,25 @@ ItemSales = Dict[str, SaleEntry]
 BSSalesHistory = Dict[str, List[float]]
 
 
+# builds the PriceDetails once at the end, so adding entries does not copy the previous ones
+class PriceDetailsBuilder:
+
+    def __init__(self) -> None:
+        self.prices: Dict[str, List[PriceEntry]] = {}
+        self.updated_at: Dict[str, Optional[int]] = {}
+
+    def __contains__(self, market_name: str) -> bool:
+        return market_name in self.prices
+
+    def add(self, market_name: str, prices: Iterable[PriceEntry], updated_at: Optional[int]):
+        self.prices.setdefault(market_name, []).extend(prices)
+        self.updated_at[market_name] = updated_at
+
+    def build(self) -> ItemPrices:
+        return {market_name: PriceDetails(prices, self.updated_at[market_name])
+                for market_name, prices in self.prices.items()}
+
+
 class ItemWithPrice(NamedTuple):
     item: Item
     item_price: float
@@ -52,7 +71,7 @@ class ItemWithPrice(NamedTuple):
 
     @property
     def market_name(self):
-        return self.item.full_name + f' ({str(self.item_condition)})'
+        return self.item.get_market_name(self.item_condition)
 
 
 class STItemPriceDetails(NamedTuple):
@@ -86,7 +105,8 @@ LFSales = Dict[str, LFItemPrice]
 
 
 def get_market_name(item_name: Union[str, Item], item_condition: ItemCondition) -> str:
-    item_name = item_name.full_name if isinstance(item_name, Item) else item_name
+    if isinstance(item_name, Item):
+        return item_name.get_market_name(item_condition)
     return f'{item_name} ({str(item_condition)})'
 
 
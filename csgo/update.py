@@ -1,27 +1,27 @@
 from csgo.bs.updater import BSUpdater
-from csgo.collection import load_collections
+from csgo.conversion import load_compiled_collections
 from csgo.dm.updater import DMUpdater
 
 
 def update_bs_prices():
-    collections = load_collections()
-    updater = BSUpdater(collections)
+    collections, conversion_map = load_compiled_collections()
+    updater = BSUpdater(collections, conversion_map=conversion_map)
     updater.update_prices()
 
 
 def update_bs_sales():
-    collections = load_collections()
-    updater = BSUpdater(collections)
+    collections, conversion_map = load_compiled_collections()
+    updater = BSUpdater(collections, conversion_map=conversion_map)
     updater.update_sales()
 
 
 def update_dm_prices():
-    collections = load_collections()
-    updater = DMUpdater(collections)
+    collections, conversion_map = load_compiled_collections()
+    updater = DMUpdater(collections, conversion_map=conversion_map)
     updater.update_prices()
 
 
 def update_dm_sales():
-    collections = load_collections()
-    updater = DMUpdater(collections)
+    collections, conversion_map = load_compiled_collections()
+    updater = DMUpdater(collections, conversion_map=conversion_map)
     updater.update_sales()
@@ -1,7 +1,112 @@
-from typing import Iterator, List
+import json
+import os
+from json.decoder import WHITESPACE
+from typing import Iterator, List, Dict, Optional, Tuple, TextIO, Any
 
 
 def get_batches(items_to_process: list, size: int = None) -> Iterator[List]:
     size = size if size else len(items_to_process)
     for i in range(0, len(items_to_process), size):
         yield items_to_process[i:i + size]
+
+
+# a missing file is a state of its own, created or removed files count as changes
+class FileWatcher:
+
+    def __init__(self, file_paths: List[str]) -> None:
+        self.file_paths = file_paths
+        self.versions = self.get_versions()
+
+    def get_versions(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        versions = {}
+        for file_path in self.file_paths:
+            try:
+                stat = os.stat(file_path)
+                versions[file_path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                versions[file_path] = None
+        return versions
+
+    def get_changed(self) -> List[str]:
+        versions = self.get_versions()
+        changed = [file_path for file_path in self.file_paths if versions[file_path] != self.versions[file_path]]
+        self.versions = versions
+        return changed
+
+
+# members of the object at path decoded one at a time with raw_decode,
+# top level members outside of the path are kept in values
+class JSONObjectStream:
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, f: TextIO, path: List[str], chunk_size: int = 1 << 16) -> None:
+        self.f = f
+        self.path = path
+        self.chunk_size = chunk_size
+        self.values: Dict[str, Any] = {}
+        self.buffer = ''
+        self.pos = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        return self.iter_members(0)
+
+    def iter_members(self, depth: int) -> Iterator[Tuple[str, Any]]:
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            if depth == len(self.path):
+                yield key, self.decode()
+            elif key == self.path[depth]:
+                yield from self.iter_members(depth + 1)
+            else:
+                value = self.decode()
+                if depth == 0:
+                    self.values[key] = value
+            if self.expect(',}') == '}':
+                return
+
+    def read_chunk(self, size: int = None) -> bool:
+        chunk = self.f.read(size or self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_chunk():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f'Expected one of {chars!r}, got {c!r}')
+        self.pos += 1
+        return c
+
+    def decode(self) -> Any:
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # value cut by the end of the chunk
+                if not self.read_chunk(size):
+                    raise
+            else:
+                # members are only decoded inside objects, so a complete value is followed by one of ',:}'.
+                # Anything else is a number cut by the end of the chunk ('12.' decodes as 12)
+                next_pos = WHITESPACE.match(self.buffer, end).end()
+                if (next_pos < len(self.buffer) and self.buffer[next_pos] in ',:}') or not self.read_chunk(size):
+                    self.pos = end
+                    return value
+            # read more on every retry, so a large value is not decoded from its start once per chunk
+            size *= 2